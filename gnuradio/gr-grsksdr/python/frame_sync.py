@@ -52,14 +52,7 @@ class frame_sync(gr.basic_block):
         nin0 = len(in0)
         nout0 = len(out0)
         _log.debug('len in0/out0: %d/%d', nin0, nout0)
-        nret = 0
-        nin = int(nin0 / self.frame_size) * self.frame_size
-        for i in range(0, nin, self.frame_size):
-            valid = self.frame_sync(in0[i : i + self.frame_size], out0[nret : nret + self.frame_size])
-            if valid:
-                nret += self.frame_size
-                if nret == nout0:
-                    break
-
-        self.consume(0, i + self.frame_size)
-        return nret
+        # Frames that don't fit in out0 are kept by frame_sync for the next call
+        nframes = self.frame_sync.call__frames(in0, out0.reshape(-1, self.frame_size))
+        self.consume(0, nin0)
+        return nframes * self.frame_size
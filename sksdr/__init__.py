@@ -8,6 +8,7 @@ from .channels import *
 from .coarse_freq_comp import *
 from .costas_loop import *
 from .fec import *
+from .fir import *
 from .frame_sync import *
 from .freq_sync import *
 from .impairments import *
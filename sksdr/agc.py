@@ -4,7 +4,8 @@ AGC algorithms.
 import logging
 
 import numpy as np
-import scipy.signal as signal
+
+from .fir import StreamingFIR
 
 _log = logging.getLogger(__name__)
 
@@ -49,8 +50,7 @@ class AGC:
         self.det_gain = det_gain
         # Moving average filter
         self._avg_len = avg_len
-        self._filter_coeffs = np.ones(self.avg_len) / self.avg_len
-        self._filter_state = np.zeros(self.avg_len - 1)
+        self._filter = StreamingFIR(np.ones(self.avg_len) / self.avg_len)
         self._gain = 0.0 # Np (neper)
 
     @property
@@ -104,7 +104,9 @@ class AGC:
         :param err: Error signal
         :return: 0 if OK, error code otherwise
         """
-        inp_pow, self._filter_state = signal.lfilter(self._filter_coeffs, 1, abs(inp)**2, zi=self._filter_state)
+        inp_pow = self._filter(inp.real**2 + inp.imag**2)
+        # Clip the round-off of the FFT method, which can make the average of zeros negative
+        np.maximum(inp_pow, 0, out=inp_pow)
         inp_pow_ln = np.log(inp_pow)
 
         for i, v in enumerate(inp):
@@ -2,13 +2,54 @@
 Coarse frequency compensation algorithms.
 """
 import logging
-from typing import Tuple
+from enum import Enum
+from typing import Tuple, Union
 
 import numpy as np
-from numpy.fft import fft, fftshift
+import scipy.fft
 
 _log = logging.getLogger(__name__)
 
+class SpectralSearch(Enum):
+    """
+    An enumeration of the methods used by :class:`CoarseFrequencyComp` to compute the spectrum where the peak is searched.
+    """
+
+    FULL_FFT = 0
+    """
+    All the :attr:`CoarseFrequencyComp.fft_size` bins are computed with an FFT.
+    """
+
+    SLIDING_DFT = 1
+    """
+    Only the admissible bins are computed, with a sliding DFT that is updated as new samples enter the buffer, and recomputed with an output-pruned FFT when it's out of date.
+    """
+
+    PRUNED_FFT = 2
+    """
+    Only the admissible bins are computed, with an output-pruned FFT.
+    """
+
+class PeakInterpolation(Enum):
+    """
+    An enumeration of the sub-bin interpolation methods used by :class:`CoarseFrequencyComp` to refine the spectrum peak.
+    """
+
+    PARABOLIC = 0
+    """
+    Parabola fitted to the magnitude of the peak bin and its two neighbors.
+    """
+
+    JACOBSEN = 1
+    """
+    Jacobsen's estimator, from the complex values of the peak bin and its two neighbors.
+    """
+
+    CANDAN = 2
+    """
+    Jacobsen's estimator with Candan's bias correction.
+    """
+
 class CoarseFrequencyComp:
     r"""
     Open loop frequency correction for a PSK signal.
@@ -24,20 +65,132 @@ class CoarseFrequencyComp:
     TODO equation
 
     where :math:`f_r` is the desired frequency resolution, specified by :attr:`freq_res`. Note that :math:`log_2\left(\frac{f_s}{f_r}\right)` should be rounded up, since it might not be integer.
+
+    The last :attr:`fft_size` samples of :math:`r^{m}(n)` are kept in a preallocated circular buffer. The buffer is transformed as is, without being unrolled into chronological order: a circular shift of the input only changes the phase of the DFT, so the magnitude spectrum, and therefore the estimate, is unaffected. The peak is searched on the unshifted spectrum and only the returned :code:`shifted_fft` is reordered.
+
+    When the maximum frequency offset (specified by :attr:`max_freq_offset`, typically :math:`\frac{R_{sym}}{2}`) is known, only the :math:`K` bins within :math:`\pm m\,\Delta f_{max}` can hold the carrier and the rest of the spectrum is not computed (see :class:`SpectralSearch`). A sliding DFT updates each bin with the difference between the samples entering and leaving the buffer, which costs :math:`K` operations per input sample. Otherwise, the buffer is split into :math:`D=N/P` decimated sequences of :math:`P \geq K` samples whose :math:`P`-point FFTs are combined only at the admissible bins, which costs :math:`N log_2(P) + KD` operations per estimate instead of :math:`N log_2(N)`. Unless :attr:`search` is given, the method is chosen on each call: the sliding DFT is updated when its cost for the :math:`n` input samples, :math:`Kn` per call over :attr:`update_interval` calls, is below that of an FFT of the buffer, and the admissible bins are recomputed with the pruned FFT at the next estimate otherwise. They are also recomputed every time the buffer is fully replaced, to avoid the accumulation of rounding errors.
+
+    The FFT size can also be set explicitly (specified by :attr:`fft_size`), below the one required by :attr:`freq_res`. The estimation is then done in two stages: the peak is first searched in the spectrum of the last :attr:`fft_size` samples, and then refined with a zoom DFT, computed as a chirp-z transform with FFTs of about :attr:`fft_size` plus twice the zoom factor points, that evaluates the spectrum of the same samples on a grid of :math:`\frac{f_s}{2^{\lceil log_2(f_s/f_r) \rceil}}` Hz, within one bin on each side of the coarse peak. The refined estimate lies on the same grid as the single stage estimate, but the size of the buffer and of the FFT only depends on :attr:`fft_size`.
+
+    Alternatively, the peak can be interpolated between bins (specified by :attr:`peak_interp`, see :class:`PeakInterpolation`) from the peak bin and its two neighbors. The estimate is then no longer restricted to a grid, so :attr:`fft_size` can be chosen for throughput and the accuracy recovered by the interpolation. The DFT of the circular buffer is rotated back to the DFT of the unrolled buffer for the three bins involved, since the estimators that use complex values depend on the phase difference between bins.
+
+    Since the carrier offset usually changes slowly, the estimate doesn't need to be updated on every call. It can be updated only every :attr:`update_interval` calls and, when :attr:`lock_snr` is given, held while the estimator is locked, i.e., while the peak SNR (ratio between the power of the peak bin and the average power of the spectrum) is above :attr:`lock_snr`. While locked, only the peak bin is evaluated, with a single bin DFT, and the spectrum is recomputed when its SNR drops below :attr:`lock_snr`. If :attr:`freeze` is set, not even that check is done until :func:`unlock` is called. The samples keep entering the buffer and the correction keeps running with the held estimate, with the phase continuity preserved.
+
+    Several channels (e.g., the outputs of a channelizer) can be processed by a single object (specified by :attr:`num_channels`). The buffers of all the channels are stacked in a 2-D array, so the spectra are computed with a single batched FFT, the peaks are searched with a vectorized argmax and the correction is applied with a single broadcast multiply. The update policy is common to all the channels: the estimator is locked only when all of them are, and all of them are estimated again when any of them loses the lock.
     """
 
-    def __init__(self, mod_order: int, sample_rate: float, freq_res: float):
+    # Cost of the sliding DFT update of one bin for one input sample, relative
+    # to that of one sample of one FFT stage. The twiddles are gathered from a
+    # table, and the pruned FFT runs its short FFTs along a strided axis.
+    _SLIDE_COST = 12
+
+    def __init__(self, mod_order: int, sample_rate: float, freq_res: float, workers: int = None,
+                 max_freq_offset: float = None, search: SpectralSearch = None, fft_size: int = None,
+                 peak_interp: PeakInterpolation = None, update_interval: int = 1, lock_snr: float = None, freeze: bool = False,
+                 num_channels: int = None):
         """
         :param mod_order: Modulation order (e.g., 2 for BPSK, 4 for QPSK)
         :param sample_rate: Input signal sampling rate (Hz)
         :param freq_res: Desired frequency resolution (Hz)
+        :param workers: Maximum number of workers used by :func:`scipy.fft.fft`. See :func:`scipy.fft.fft` for details.
+        :param max_freq_offset: Maximum frequency offset that can be estimated (Hz). If None, the whole spectrum is searched.
+        :param search: Method used to compute the spectrum. If None, it's chosen on each call from the number of admissible bins and the input length.
+        :param fft_size: FFT size (power of 2). If None, it's determined from :attr:`sample_rate` and :attr:`freq_res`. If smaller than that, the estimate is refined to :attr:`freq_res` with a zoom DFT, unless :code:`peak_interp` is given.
+        :param peak_interp: Sub-bin peak interpolation method. If None, the peak is not interpolated.
+        :param update_interval: Number of calls between estimate updates
+        :param lock_snr: Peak SNR above which the estimate is held (dB). If None, the estimate is never held.
+        :param freeze: Whether the estimate is held without checking the peak SNR, once locked. It requires :code:`lock_snr`.
+        :param num_channels: Number of channels. If None, the input is a single channel 1-D array, otherwise it's a (num_channels, samples) array.
         """
+        if update_interval < 1:
+            raise ValueError(f'Invalid update interval {update_interval}. Must be >= 1.')
+        if freeze and lock_snr is None:
+            raise ValueError(f'Invalid freeze {freeze}. lock_snr is required.')
         self._mod_order = mod_order
         self._sample_rate = sample_rate
         self._freq_res = freq_res
-        self._fft_size = int(2**np.ceil(np.log2(self._sample_rate / self._freq_res)))
-        self._buf = np.zeros(self._fft_size, dtype=complex)
-        self._sum_phase = 0.0
+        self._workers = workers
+        self._max_freq_offset = max_freq_offset
+        res_size = int(2**np.ceil(np.log2(self._sample_rate / self._freq_res)))
+        if fft_size is None:
+            fft_size = res_size
+        elif fft_size < 2 or fft_size & (fft_size - 1):
+            raise ValueError(f'Invalid FFT size {fft_size}. Must be a power of 2.')
+        self._fft_size = fft_size
+        self._peak_interp = peak_interp
+        self._update_interval = update_interval
+        self._lock_snr = lock_snr
+        self._freeze = freeze
+        self._num_channels = num_channels
+        channels = 1 if num_channels is None else num_channels
+        # Number of fine grid points per FFT bin
+        self._zoom = 1 if self.peak_interp is not None else max(res_size // self.fft_size, 1)
+        # Circular buffer with the last fft_size samples of the raised signal
+        self._buf = np.zeros((channels, self._fft_size), dtype=complex)
+        self._buf_idx = 0
+
+        # Admissible bins (signed)
+        if self.max_freq_offset is None:
+            self._bins = None
+        else:
+            df = self.sample_rate / self.fft_size
+            half = min(int(np.ceil(self.max_freq_offset * self.mod_order / df)), self.fft_size // 2 - 1)
+            self._bins = np.arange(-half, half + 1)
+        if search is None and self._bins is None:
+            search = SpectralSearch.FULL_FFT
+        elif search not in (None, SpectralSearch.FULL_FFT) and self._bins is None:
+            raise ValueError(f'Invalid search {search}. max_freq_offset is required.')
+        self._search = search
+        if self.search == SpectralSearch.FULL_FFT:
+            self._bins = None
+        else:
+            prune_size = min(int(2**np.ceil(np.log2(len(self._bins)))), self.fft_size)
+            self._prune_shape = (prune_size, self.fft_size // prune_size)
+            self._prune_rows = self._bins % prune_size
+            self._prune_twiddle = np.exp(-2j * np.pi * np.outer(self._bins, np.arange(self._prune_shape[1])) / self.fft_size)
+        # Whether the sliding DFT can be updated, and its cost limit per input
+        # sample, amortized over the calls between estimates
+        self._sliding = self.search in (None, SpectralSearch.SLIDING_DFT)
+        if self._sliding:
+            self._sdft = np.zeros((channels, len(self._bins)), dtype=complex)
+            self._sdft_count = 0
+            if self.search is None:
+                self._slide_size = self.fft_size * np.log2(self.fft_size) / (self._SLIDE_COST * len(self._bins) * self.update_interval)
+            else:
+                self._slide_size = np.inf
+        if self._sliding or self._zoom > 1 or self.lock_snr is not None:
+            self._twiddle = np.exp(-2j * np.pi * np.arange(self.fft_size) / self.fft_size)
+        if self._zoom > 1:
+            # Chirp-z transform (Bluestein) for the fine grid offsets within one
+            # bin on each side, with W = exp(-2j*pi/(fft_size*zoom)). The
+            # chirp W^(n^2/2) is computed from n^2 modulo its period, which is exact.
+            num_points = 2 * self._zoom + 1
+            res_size = self.fft_size * self._zoom
+            size = scipy.fft.next_fast_len(self.fft_size + num_points - 1)
+            n = np.arange(max(self.fft_size, num_points))
+            chirp = np.exp(-1j * np.pi * (n**2 % (2 * res_size)) / res_size)
+            # Starting one bin below DC
+            self._zoom_pre = chirp[:self.fft_size] * np.exp(2j * np.pi * n[:self.fft_size] / self.fft_size)
+            self._zoom_post = chirp[:num_points]
+            zoom_filter = np.zeros(size, dtype=complex)
+            zoom_filter[:num_points] = np.conj(chirp[:num_points])
+            zoom_filter[size - self.fft_size + 1:] = np.conj(chirp[1:self.fft_size][::-1])
+            self._zoom_filter = scipy.fft.fft(zoom_filter)
+
+        # Estimate update state
+        self._calls = 0
+        self._locked = False
+        self._freq_offset = np.zeros(channels)
+        self._peak_bin = np.zeros(channels, dtype=int)
+        # Chunk size of the single bin DFT, about the square root of the FFT size
+        self._peak_chunk = 1 << int(np.log2(self.fft_size)) // 2
+
+        # Scratch arrays, reused across calls
+        self._mag = np.empty((channels, self.fft_size if self._bins is None else len(self._bins)))
+        self._time_steps = np.empty(0)
+        self._phase = np.empty((channels, 0))
+        self._nco = np.empty((channels, 0), dtype=complex)
+        self._sum_phase = np.zeros(channels)
 
     @property
     def mod_order(self) -> int:
@@ -63,42 +216,309 @@ class CoarseFrequencyComp:
     @property
     def fft_size(self) -> int:
         """
-        FFT size. This is a power of 2, determined from :attr:`sample_rate` and :attr:`freq_res`.
+        FFT size. This is a power of 2, determined from :attr:`sample_rate` and :attr:`freq_res` unless given explicitly. It's also the number of samples kept in the buffer.
         """
         return self._fft_size
 
-    def __call__(self, inp: np.ndarray, out: np.ndarray, shifted_fft: np.ndarray = None) -> Tuple[int, float]:
+    @property
+    def workers(self) -> int:
+        """
+        Maximum number of workers used by :func:`scipy.fft.fft`.
+        """
+        return self._workers
+
+    @property
+    def max_freq_offset(self) -> float:
+        """
+        Maximum frequency offset that can be estimated (Hz). If None, the whole spectrum is searched.
+        """
+        return self._max_freq_offset
+
+    @property
+    def search(self) -> SpectralSearch:
+        """
+        Method used to compute the spectrum. If None, it's chosen on each call.
+        """
+        return self._search
+
+    @property
+    def peak_interp(self) -> PeakInterpolation:
+        """
+        Sub-bin peak interpolation method. If None, the peak is not interpolated.
+        """
+        return self._peak_interp
+
+    @property
+    def update_interval(self) -> int:
+        """
+        Number of calls between estimate updates.
+        """
+        return self._update_interval
+
+    @property
+    def lock_snr(self) -> float:
+        """
+        Peak SNR above which the estimate is held (dB). If None, the estimate is never held.
+        """
+        return self._lock_snr
+
+    @property
+    def freeze(self) -> bool:
+        """
+        Whether the estimate is held without checking the peak SNR, once locked.
+        """
+        return self._freeze
+
+    @property
+    def num_channels(self) -> int:
+        """
+        Number of channels. If None, the input is a single channel 1-D array.
+        """
+        return self._num_channels
+
+    @property
+    def locked(self) -> bool:
+        """
+        Whether the estimate is currently held.
+        """
+        return self._locked
+
+    def unlock(self):
+        """
+        Releases the held estimate, so that it's updated on the next scheduled call.
+        """
+        self._locked = False
+
+    def __call__(self, inp: np.ndarray, out: np.ndarray, shifted_fft: np.ndarray = None) -> Tuple[int, Union[float, np.ndarray]]:
         """
         The main work function.
 
-        :param inp: Input signal
-        :param out: Output signal
-        :param shifted_fft: PSD of input signal. The size of this array should be :attr:`fft_size`.
-        :return: The first element is the return value (0 if OK, error code otherwise). The second element is the computed frequency offset of the input signal.
+        :param inp: Input signal. If :attr:`num_channels` is given, its shape should be (:attr:`num_channels`, samples).
+        :param out: Output signal, with the same shape as ``inp``
+        :param shifted_fft: PSD of input signal. The size of this array should be :attr:`fft_size` (or (:attr:`num_channels`, :attr:`fft_size`) for multiple channels). When only the admissible bins are computed, the remaining bins are set to 0. It's left untouched when the estimate isn't updated.
+        :return: The first element is the return value (0 if OK, error code otherwise). The second element is the computed frequency offset of the input signal (one per channel if :attr:`num_channels` is given).
         """
-        if len(inp) > self.fft_size:
+        if self.num_channels is None:
+            inp = inp[np.newaxis]
+            out = out[np.newaxis]
+            if shifted_fft is not None:
+                shifted_fft = shifted_fft[np.newaxis]
+        elif inp.ndim != 2 or inp.shape[0] != self.num_channels:
+            raise ValueError(f'Invalid input shape {inp.shape}. Must be ({self.num_channels}, samples).')
+        if inp.shape[1] > self.fft_size:
             # TODO Implement average fft
             raise NotImplementedError('Average FFT not implemented')
 
-        time_steps = np.arange(0, len(inp) + 1)
-        raised = inp**self._mod_order
-        buf = np.hstack((self._buf[len(raised):], raised))
-        self._buf = buf
+        update = self._calls % self.update_interval == 0 and not (self.freeze and self.locked)
+        self._calls += 1
+        if self._sliding and not self.locked and inp.shape[1] <= self._slide_size:
+            self._sliding_push(inp)
+        else:
+            self._push(inp)
+            if self._sliding:
+                # Not worth keeping the sliding DFT updated, recompute it when needed
+                self._sdft_count = self.fft_size
 
-        shift_fft = fftshift(abs(fft(buf, self.fft_size)))
-        if shifted_fft is not None:
-            shifted_fft[:] = shift_fft
-
-        max_idx = np.argmax(shifted_fft)
-        offset_idx = max_idx - self.fft_size / 2
-        df = self.sample_rate / self.fft_size
-        freq_offset = df * (offset_idx) / self.mod_order
-        phase = freq_offset * time_steps / self.sample_rate
+        if update and self.locked:
+            peak_mag = np.abs(self._peak_dft())
+            update = np.any(self._snr_db(peak_mag, self._energy()) < self.lock_snr)
+        if update:
+            self._freq_offset = self._estimate(shifted_fft)
 
         # Frequency correction
-        out[:] = inp * np.exp(1j * 2 * np.pi * (self._sum_phase - phase[:-1]))
-        self._sum_phase -= phase[-1]
-        return 0, freq_offset
+        self._correct(inp, self._freq_offset, out)
+        if self.num_channels is None:
+            return 0, float(self._freq_offset[0])
+        return 0, self._freq_offset.copy()
+
+    def _estimate(self, shifted_fft: np.ndarray) -> np.ndarray:
+        """
+        Estimates the frequency offset of each channel from the spectrum of the buffer.
+
+        :param shifted_fft: PSD of input signal
+        :return: Frequency offset of each channel (Hz)
+        """
+        # The spectrum of the circular buffer has the same magnitude as the
+        # spectrum of the unrolled buffer
+        if self.search == SpectralSearch.FULL_FFT:
+            spec = scipy.fft.fft(self._buf, axis=-1, workers=self.workers)
+            mag = np.abs(spec, out=self._mag)
+            if shifted_fft is not None:
+                shifted_fft[:] = scipy.fft.fftshift(mag, axes=-1)
+            # Map the unshifted peak index to a signed bin offset
+            max_idx = np.argmax(mag, axis=-1)
+            offset_idx = np.where(max_idx >= self.fft_size // 2, max_idx - self.fft_size, max_idx)
+            if self.peak_interp is not None:
+                peak_idx = (max_idx[:, np.newaxis] + np.arange(-1, 2)) % self.fft_size
+                offset_idx = offset_idx + self._interpolate(offset_idx, np.take_along_axis(spec, peak_idx, axis=-1))
+        else:
+            if not self._sliding:
+                spec = self._pruned_fft()
+            else:
+                if self._sdft_count >= self.fft_size:
+                    self._sdft[:] = self._pruned_fft()
+                    self._sdft_count = 0
+                spec = self._sdft
+            mag = np.abs(spec, out=self._mag)
+            if shifted_fft is not None:
+                shifted_fft[:] = 0
+                shifted_fft[:, self._bins + self.fft_size // 2] = mag
+            max_idx = np.argmax(mag, axis=-1)
+            offset_idx = self._bins[max_idx]
+            if self.peak_interp is not None:
+                # The peaks at the edges of the band are not interpolated
+                inner = (max_idx > 0) & (max_idx < len(self._bins) - 1)
+                peak_idx = np.clip(max_idx, 1, len(self._bins) - 2)[:, np.newaxis] + np.arange(-1, 2)
+                delta = self._interpolate(offset_idx, np.take_along_axis(spec, peak_idx, axis=-1))
+                offset_idx = offset_idx + np.where(inner, delta, 0.0)
+        if self.lock_snr is not None:
+            peak_mag = np.take_along_axis(mag, max_idx[:, np.newaxis], axis=-1)[:, 0]
+            self._locked = bool(np.all(self._snr_db(peak_mag, self._energy()) >= self.lock_snr))
+            if self.locked:
+                self._peak_bin = np.round(offset_idx).astype(int)
+        if self._zoom > 1:
+            offset_idx = self._refine(offset_idx)
+        df = self.sample_rate / (self.fft_size * self._zoom)
+        return df * offset_idx / self.mod_order
+
+    def _peak_dft(self) -> np.ndarray:
+        """
+        Computes the DFT of the circular buffer of each channel at its held peak bin.
+
+        The buffer is split into chunks of :math:`C` samples, and the DFT is the sum of the DFTs of the chunks at the peak bin, each rotated by the start of its chunk. Both sets of twiddles, :math:`C` and :math:`N/C`, are read from the twiddle table with a modular index, so no array of the size of the buffer is allocated.
+
+        :return: DFT at the peak bin of each channel
+        """
+        chunk = self._peak_chunk
+        num_chunks = self.fft_size // chunk
+        inner = self._twiddle[np.outer(self._peak_bin, np.arange(chunk)) % self.fft_size]
+        outer = self._twiddle[np.outer(self._peak_bin * chunk, np.arange(num_chunks)) % self.fft_size]
+        chunks = np.matmul(self._buf.reshape(len(self._buf), num_chunks, chunk), inner[:, :, np.newaxis])[:, :, 0]
+        return np.einsum('cj,cj->c', chunks, outer)
+
+    def _energy(self) -> np.ndarray:
+        """
+        Computes the energy of the buffer of each channel.
+
+        :return: Energy of each channel
+        """
+        # From views of the real and imaginary parts, without a conjugated copy
+        return np.einsum('cn,cn->c', self._buf.real, self._buf.real) + np.einsum('cn,cn->c', self._buf.imag, self._buf.imag)
+
+    def _snr_db(self, peak_mag: np.ndarray, energy: np.ndarray) -> np.ndarray:
+        """
+        Computes the peak SNR of the spectrum. By Parseval's theorem, the average power of the spectrum is the energy of the buffer.
+
+        :param peak_mag: Magnitude of the peak bin of each channel
+        :param energy: Energy of the buffer of each channel
+        :return: Peak SNR of each channel (dB)
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            snr = 10 * np.log10(peak_mag**2 / energy)
+        return np.where(energy > 0, snr, -np.inf)
+
+    def _push(self, inp: np.ndarray):
+        """
+        Raises the input signal to the :attr:`mod_order` power and writes it into the circular buffer.
+
+        :param inp: Input signal, one row per channel
+        """
+        n = inp.shape[1]
+        end = self._buf_idx + n
+        if end <= self.fft_size:
+            np.power(inp, self.mod_order, out=self._buf[:, self._buf_idx:end])
+        else:
+            split = self.fft_size - self._buf_idx
+            np.power(inp[:, :split], self.mod_order, out=self._buf[:, self._buf_idx:])
+            np.power(inp[:, split:], self.mod_order, out=self._buf[:, :end - self.fft_size])
+        self._buf_idx = end % self.fft_size
+
+    def _sliding_push(self, inp: np.ndarray):
+        """
+        Same as :func:`_push`, but also updates the sliding DFT of the admissible bins.
+
+        :param inp: Input signal, one row per channel
+        """
+        n = inp.shape[1]
+        self._sdft_count += n
+        if self._sdft_count >= self.fft_size:
+            # Recompute from scratch when estimating, which also discards the
+            # accumulated rounding errors
+            self._push(inp)
+            return
+        pos = (self._buf_idx + np.arange(n)) % self.fft_size
+        old = self._buf[:, pos]
+        self._push(inp)
+        delta = self._buf[:, pos] - old
+        self._sdft += delta.dot(self._twiddle[np.outer(pos, self._bins) % self.fft_size])
+
+    def _interpolate(self, offset_idx: np.ndarray, peak: np.ndarray) -> np.ndarray:
+        """
+        Interpolates the spectrum peak between bins.
+
+        :param offset_idx: Peak bin of each channel
+        :param peak: DFT of the circular buffer at the bins before, at and after the peak, one row per channel
+        :return: Fractional offset from the peak bin of each channel, in [-0.5, 0.5]
+        """
+        if self.peak_interp == PeakInterpolation.PARABOLIC:
+            prev, cur, nxt = np.abs(peak).T
+            num = 0.5 * (prev - nxt)
+            den = prev - 2 * cur + nxt
+        else:
+            # Rotate back to the DFT of the unrolled buffer
+            rot = np.exp(2j * np.pi * (offset_idx[:, np.newaxis] + np.arange(-1, 2)) * self._buf_idx / self.fft_size)
+            prev, cur, nxt = (peak * rot).T
+            num = prev - nxt
+            den = 2 * cur - prev - nxt
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = np.where(den != 0, (num / den).real, 0.0)
+        if self.peak_interp == PeakInterpolation.CANDAN:
+            delta *= np.tan(np.pi / self.fft_size) / (np.pi / self.fft_size)
+        return np.clip(delta, -0.5, 0.5)
+
+    def _refine(self, offset_idx: np.ndarray) -> np.ndarray:
+        """
+        Refines the coarse peak with a zoom DFT of the unrolled buffer.
+
+        :param offset_idx: Coarse peak of each channel (FFT bins)
+        :return: Refined peak of each channel (fine grid points)
+        """
+        # Bring the coarse peak to DC; the circular buffer holds the samples
+        # from _buf_idx onwards first
+        demod = np.roll(self._buf, -self._buf_idx, axis=-1) * self._twiddle[np.outer(offset_idx, np.arange(self.fft_size)) % self.fft_size]
+        size = len(self._zoom_filter)
+        conv = scipy.fft.ifft(scipy.fft.fft(demod * self._zoom_pre, size, axis=-1, workers=self.workers) * self._zoom_filter, axis=-1, workers=self.workers)
+        zoom = conv[:, :len(self._zoom_post)] * self._zoom_post
+        return offset_idx * self._zoom + np.argmax(np.abs(zoom), axis=-1) - self._zoom
+
+    def _pruned_fft(self) -> np.ndarray:
+        """
+        Computes the DFT of the circular buffer at the admissible bins only.
+
+        :return: DFT at the admissible bins, one row per channel
+        """
+        dec = scipy.fft.fft(self._buf.reshape((-1,) + self._prune_shape), axis=1, workers=self.workers)
+        return np.einsum('kr,ckr->ck', self._prune_twiddle, dec[:, self._prune_rows])
+
+    def _correct(self, inp: np.ndarray, freq_offset: np.ndarray, out: np.ndarray):
+        """
+        Applies the frequency correction, keeping the NCO phase continuous across calls.
+
+        :param inp: Input signal, one row per channel
+        :param freq_offset: Estimated frequency offset of each channel (Hz)
+        :param out: Output signal, one row per channel
+        """
+        n = inp.shape[1]
+        if self._phase.shape[1] < n + 1:
+            self._time_steps = np.arange(0, n + 1, dtype=float)
+            self._phase = np.empty((len(self._buf), n + 1))
+            self._nco = np.empty((len(self._buf), n), dtype=complex)
+        phase = np.multiply.outer(freq_offset / self.sample_rate, self._time_steps[:n + 1], out=self._phase[:, :n + 1])
+        np.subtract(self._sum_phase[:, np.newaxis], phase[:, :-1], out=phase[:, :-1])
+        nco = np.multiply(1j * 2 * np.pi, phase[:, :-1], out=self._nco[:, :n])
+        np.exp(nco, out=nco)
+        np.multiply(inp, nco, out=out)
+        self._sum_phase -= phase[:, -1]
 
     def __repr__(self) -> str:
         """
@@ -106,5 +526,8 @@ class CoarseFrequencyComp:
 
         :return: A string representing the object and its properties
         """
-        args = 'mod_order={}, sample_rate={}, freq_res={}, fft_size={}'.format(self.mod_order, self.sample_rate, self.freq_res, self.fft_size)
+        args = 'mod_order={}, sample_rate={}, freq_res={}, fft_size={}, workers={}, max_freq_offset={}, search={}, peak_interp={}, ' \
+               'update_interval={}, lock_snr={}, freeze={}, num_channels={}' \
+               .format(self.mod_order, self.sample_rate, self.freq_res, self.fft_size, self.workers, self.max_freq_offset, self.search, self.peak_interp,
+                       self.update_interval, self.lock_snr, self.freeze, self.num_channels)
         return '{}({})'.format(self.__class__.__name__, args)
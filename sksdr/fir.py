@@ -0,0 +1,204 @@
+"""
+FIR filtering.
+"""
+import logging
+from enum import Enum
+
+import numpy as np
+import scipy.fft
+
+_log = logging.getLogger(__name__)
+
+class FirMethod(Enum):
+    """
+    How :class:`StreamingFIR` filters a block of samples.
+    """
+    DIRECT = 1
+    """
+    One vectorized multiply-accumulate per coefficient, the cheapest for very few coefficients.
+    """
+    CONVOLVE = 2
+    """
+    Direct convolution with :func:`numpy.convolve`, or a matrix product for a bank of filters.
+    """
+    FFT = 3
+    """
+    Overlap-save FFT, the cheapest for many coefficients and large blocks.
+    """
+
+class StreamingFIR:
+    """
+    Streaming FIR filter.
+
+    Each block is filtered by the method estimated to be the cheapest for the number of coefficients and the block size, unless :attr:`method` is given: :attr:`FirMethod.DIRECT` for up to 2 coefficients, and otherwise :attr:`FirMethod.CONVOLVE` or :attr:`FirMethod.FFT`, comparing the number of multiply-accumulates with the cost of the FFTs. All the methods keep the same state, the last ``len(coeffs) - 1`` input samples, so the method can change from one block to the next.
+
+    A complex input filtered by real coefficients is filtered as two real signals, its real and imaginary parts, where that's cheaper: by direct convolution with few coefficients, numpy having faster loops for short real convolutions. Real inputs filtered by real coefficients use real FFTs.
+
+    A bank of filters with the same number of coefficients can be given as a 2-D array, one filter per row. The input is then transformed only once, and the output has one row per filter.
+
+    Only some outputs of a block can be computed instead, with :func:`extend` and :func:`at`.
+
+    Example:
+
+    >>> import sksdr
+    >>> import numpy as np
+    >>> fir = sksdr.StreamingFIR(np.ones(2))
+    >>> fir(np.array([1.0, 2.0])), fir(np.array([3.0]))
+    (array([1., 3.]), array([5.]))
+    """
+
+    # Maximum number of complex coefficients of the direct method
+    _DIRECT_TAPS = 2
+    # Maximum number of real coefficients for which the real and imaginary
+    # parts of a complex input are filtered separately, numpy having faster
+    # loops for short real convolutions
+    _SPLIT_TAPS = 11
+    # Minimum block size from which a bank is filtered one row at a time
+    # rather than by a matrix product
+    _ROWS_SIZE = 1024
+    # Relative cost of one FFT butterfly with respect to one direct form MAC
+    _FFT_COST = 6
+
+    def __init__(self, coeffs: np.ndarray, method: FirMethod = None):
+        """
+        :param coeffs: Filter coefficients, or one filter per row
+        :param method: Filtering method. By default, it's chosen for each block.
+        """
+        self._coeffs = np.asarray(coeffs)
+        self._method = method
+        self._num_taps = self._coeffs.shape[-1]
+        self._num_filters = 1 if self._coeffs.ndim == 1 else len(self._coeffs)
+        self._fft_size = int(2**np.ceil(np.log2(4 * self._num_taps)))
+        self._step = self._fft_size - self._num_taps + 1
+        self._coeffs_fft = None
+        self._coeffs_rfft = None
+        self._history = np.zeros(self._num_taps - 1, dtype=self._coeffs.dtype)
+
+    @property
+    def coeffs(self) -> np.ndarray:
+        """
+        Filter coefficients, or one filter per row.
+        """
+        return self._coeffs
+
+    @property
+    def method(self) -> FirMethod:
+        """
+        Filtering method, or None if it's chosen for each block.
+        """
+        return self._method
+
+    def __call__(self, inp: np.ndarray) -> np.ndarray:
+        """
+        Filters a block of the input signal.
+
+        :param inp: Input signal
+        :return: Filtered signal, or one filtered signal per row for a bank of filters
+        """
+        return self._filter(self.extend(inp), len(inp))
+
+    def extend(self, inp: np.ndarray) -> np.ndarray:
+        """
+        Prepends the state to a block of the input signal, and updates the state.
+
+        :param inp: Input signal
+        :return: The last ``len(coeffs) - 1`` samples of the previous blocks, followed by the input signal
+        """
+        ext = np.concatenate((self._history, inp))
+        self._history = ext[len(inp):]
+        return ext
+
+    def at(self, ext: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """
+        Filters part of a block of the input signal.
+
+        :param ext: Input signal, as returned by :func:`extend`
+        :param start: Index of the first output sample, relative to the start of the input signal
+        :param stop: Index past the last output sample
+        :return: Filtered signal from ``start`` to ``stop``, or one filtered signal per row for a bank of filters
+        """
+        n = max(stop - start, 0)
+        return self._filter(ext[start:start + n + self._num_taps - 1], n)
+
+    def _select(self, n: int) -> FirMethod:
+        """
+        Chooses the filtering method of a block.
+
+        :param n: Number of output samples
+        :return: Filtering method
+        """
+        if self.method is not None:
+            return self.method
+        if self._num_taps <= self._DIRECT_TAPS and np.iscomplexobj(self.coeffs):
+            return FirMethod.DIRECT
+        num_steps = -(-n // self._step)
+        # The forward FFT is shared by all the filters of a bank
+        fft_cost = self._FFT_COST * num_steps * self._fft_size * np.log2(self._fft_size) * (self._num_filters + 1) / 2
+        return FirMethod.CONVOLVE if n * self._num_taps * self._num_filters <= fft_cost else FirMethod.FFT
+
+    def _filter(self, ext: np.ndarray, n: int) -> np.ndarray:
+        """
+        Filters the input signal preceded by its last ``len(coeffs) - 1`` samples.
+
+        :param ext: Input signal, preceded by the previous samples
+        :param n: Number of output samples
+        :return: Filtered signal, or one filtered signal per row for a bank of filters
+        """
+        if n == 0:
+            return np.empty(self.coeffs.shape[:-1] + (0,), dtype=np.result_type(ext, self.coeffs))
+        method = self._select(n)
+        if method == FirMethod.DIRECT:
+            coeffs = self.coeffs[..., np.newaxis]
+            out = coeffs[..., 0, :] * ext[self._num_taps - 1:]
+            for k in range(1, self._num_taps):
+                out += coeffs[..., k, :] * ext[self._num_taps - 1 - k:self._num_taps - 1 - k + n]
+            return out
+        if method == FirMethod.CONVOLVE:
+            if self.coeffs.ndim == 1:
+                return self._convolve(ext, self.coeffs)
+            if n >= self._ROWS_SIZE:
+                return np.stack([self._convolve(ext, coeffs) for coeffs in self.coeffs])
+            windows = np.lib.stride_tricks.as_strided(ext, (n, self._num_taps), ext.strides * 2, writeable=False)
+            return self.coeffs[:, ::-1] @ windows.T
+
+        # Overlap-save, with all the segments transformed in a single batched FFT
+        num_steps = -(-n // self._step)
+        seg = np.zeros(num_steps * self._step + self._num_taps - 1, dtype=ext.dtype)
+        seg[:len(ext)] = ext
+        seg = np.lib.stride_tricks.as_strided(seg, (num_steps, self._fft_size), (self._step * seg.itemsize, seg.itemsize), writeable=False)
+        if np.iscomplexobj(ext) or np.iscomplexobj(self.coeffs):
+            if self._coeffs_fft is None:
+                self._coeffs_fft = scipy.fft.fft(self.coeffs, self._fft_size, axis=-1)
+            out = scipy.fft.ifft(scipy.fft.fft(seg, axis=-1) * self._coeffs_fft[..., np.newaxis, :], axis=-1)
+        else:
+            # Real FFTs, with half the bins
+            if self._coeffs_rfft is None:
+                self._coeffs_rfft = scipy.fft.rfft(self.coeffs, self._fft_size, axis=-1)
+            out = scipy.fft.irfft(scipy.fft.rfft(seg, axis=-1) * self._coeffs_rfft[..., np.newaxis, :], self._fft_size, axis=-1)
+        return out[..., self._num_taps - 1:].reshape(self.coeffs.shape[:-1] + (-1,))[..., :n]
+
+    def _convolve(self, ext: np.ndarray, coeffs: np.ndarray) -> np.ndarray:
+        """
+        Filters the input signal by direct convolution.
+
+        The real and imaginary parts of a complex input filtered by few real coefficients are read and written through views of the complex arrays, without copies.
+
+        :param ext: Input signal, preceded by the previous samples
+        :param coeffs: Filter coefficients
+        :return: Filtered signal
+        """
+        if not np.iscomplexobj(ext) or np.iscomplexobj(coeffs) or len(coeffs) > self._SPLIT_TAPS:
+            return np.convolve(ext, coeffs, mode='valid')
+        out = np.empty(len(ext) - len(coeffs) + 1, dtype=np.result_type(ext, coeffs))
+        out.real = np.convolve(ext.real, coeffs, mode='valid')
+        out.imag = np.convolve(ext.imag, coeffs, mode='valid')
+        return out
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'coeffs={}, method={}'.format(self.coeffs, self.method)
+        return '{}({})'.format(self.__class__.__name__, args)
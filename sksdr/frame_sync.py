@@ -2,31 +2,256 @@
 Frame synchronization algorithms.
 """
 import logging
+from enum import Enum
+from typing import Iterable, List, Union
 
 import numpy as np
-import scipy.signal as signal
+
+from .fir import StreamingFIR
+from .sequences import bipolar
 
 _log = logging.getLogger(__name__)
 
+class FrameDetection(Enum):
+    """
+    What the correlation with the preamble is compared with to detect a frame.
+    """
+    ABSOLUTE = 1
+    """
+    The correlation magnitude is compared with the threshold, so the threshold depends on the signal level.
+    """
+    NORMALIZED = 2
+    """
+    The correlation magnitude, divided by the norms of the preamble and of the input over the preamble window, is compared with the threshold, which is then within (0, 1].
+    """
+    CFAR = 3
+    """
+    Constant false alarm rate. The correlation magnitude, divided by the RMS correlation magnitude over a reference window before the preamble, is compared with the threshold.
+    """
+
+class _SignCorrelator(StreamingFIR):
+    """
+    Streaming two-stage correlator with a single filter.
+
+    The first stage correlates the signs of the real and imaginary parts of the input with the signs of those of the preamble, for every sample. The signs of each 8 consecutive samples are packed into a 16-bit index, and the contribution of each chunk of 8 preamble samples to the real and imaginary parts of the correlation is read from a table indexed by it. Only the samples where the magnitude of this coarse correlation reaches ``threshold`` times its value for the preamble itself (the number of nonzero real and imaginary parts of the preamble) go through the second stage, the full-precision correlation. The output is zero elsewhere.
+
+    The state is the same as that of :class:`StreamingFIR`, the last ``len(coeffs) - 1`` input samples, and :func:`at` still computes the full-precision correlation. The packed correlation limits the preamble length to 16376 samples, 2047 chunks of 8.
+    """
+
+    # Number of samples per table index
+    _CHUNK = 8
+    # Maximum number of chunks, so that the offset real part of the
+    # correlation, up to 4 * 8 per chunk, doesn't carry into the imaginary part
+    _MAX_CHUNKS = 0xffff // (4 * _CHUNK)
+
+    def __init__(self, coeffs: np.ndarray, threshold: float):
+        """
+        :param coeffs: Filter coefficients, the flipped conjugate of the preamble
+        :param threshold: Coarse correlation threshold, relative to the coarse correlation of the preamble with itself
+        """
+        super().__init__(coeffs)
+        self._num_chunks = -(-self._num_taps // self._CHUNK)
+        if self._num_chunks > self._MAX_CHUNKS:
+            raise ValueError(f'Invalid preamble length {self._num_taps}. Must be at most {self._MAX_CHUNKS * self._CHUNK} for two-stage detection.')
+        preamble = np.zeros(self._num_chunks * self._CHUNK, dtype=complex)
+        preamble[:self._num_taps] = np.conj(coeffs[::-1])
+        # Zero preamble samples don't contribute to the coarse correlation
+        self._preamble_signs = np.sign(preamble.real), np.sign(preamble.imag)
+        # Tables for real and complex inputs, built on first use
+        self._tables = {}
+        # The coarse correlation of the preamble with itself is the number of
+        # nonzero real and imaginary parts
+        self._threshold = (threshold * np.count_nonzero(self._preamble_signs))**2
+
+    def __call__(self, inp: np.ndarray) -> np.ndarray:
+        """
+        Filters a block of the input signal.
+
+        :param inp: Input signal
+        :return: Filtered signal, zero where the coarse correlation is below the threshold
+        """
+        n = len(inp)
+        ext = self.extend(inp)
+        if n == 0:
+            return self.at(ext, 0, 0)
+
+        # Coarse correlation. The real and imaginary parts are accumulated
+        # in the low and high halves of each table entry.
+        is_complex = np.iscomplexobj(ext)
+        tables = self._get_tables(is_complex)
+        index = self._chunk_index(ext.real)
+        if is_complex:
+            index |= self._chunk_index(ext.imag) << 8
+        acc = tables[0][index[:n]]
+        for c in range(1, self._num_chunks):
+            acc += tables[c][index[c * self._CHUNK:c * self._CHUNK + n]]
+        bias = 2 * self._CHUNK * self._num_chunks
+        # Both fields are unsigned, and only signed once unpacked. Their
+        # squares add up to less than 2**31.
+        re = (acc & 0xffff).view(np.int32)
+        re -= bias
+        np.multiply(re, re, out=re)
+        im = np.right_shift(acc, 16, out=acc).view(np.int32)
+        im -= bias
+        np.multiply(im, im, out=im)
+        im += re
+        candidates = np.flatnonzero(im >= self._threshold)
+
+        # Full-precision correlation at the candidates only
+        out = np.zeros(n, dtype=np.result_type(ext, self._coeffs))
+        if len(candidates):
+            windows = np.lib.stride_tricks.as_strided(ext, (n, self._num_taps), ext.strides * 2, writeable=False)
+            out[candidates] = windows[candidates] @ self._coeffs[::-1]
+        return out
+
+    def _chunk_index(self, x: np.ndarray) -> np.ndarray:
+        """
+        Packs the signs of each 8 consecutive samples.
+
+        :param x: Real signal
+        :return: Bit k of element i is set if ``x[i + k]`` is negative. Samples past the end are taken as positive.
+        """
+        bits = np.packbits(x < 0, bitorder='little')
+        packed = np.zeros(len(bits) + 1, dtype=np.uint16)
+        packed[:-1] = bits
+        # Bytes i and i + 1, so that any 8 bits starting in byte i can be shifted out
+        pairs = packed[:-1] | (packed[1:] << 8)
+        index = np.empty(len(pairs) * self._CHUNK, dtype=np.uint16)
+        for shift in range(self._CHUNK):
+            np.right_shift(pairs, shift, out=index[shift::self._CHUNK])
+        index &= 0xff
+        # Room for the chunks of the last windows
+        return np.concatenate((index[:len(x)], np.zeros(self._num_chunks * self._CHUNK, dtype=np.uint16)))
+
+    def _get_tables(self, is_complex: bool) -> List[np.ndarray]:
+        """
+        Gets the coarse correlation tables, one per chunk of the preamble.
+
+        :param is_complex: Whether the input is complex. Otherwise, the imaginary part of the input doesn't contribute.
+        :return: Tables indexed by the packed signs of the real part of a chunk of the input, and of its imaginary part shifted by 8 bits. Each entry holds the real part of the correlation of the chunk in its low 16 bits, and its imaginary part in its high 16 bits, both offset by 2 * 8.
+        """
+        if is_complex not in self._tables:
+            bits = (np.arange(1 << 2 * self._CHUNK)[:, np.newaxis] >> np.arange(2 * self._CHUNK)) & 1
+            signs = 1 - 2 * bits
+            signs_re = signs[:, :self._CHUNK]
+            signs_im = signs[:, self._CHUNK:] if is_complex else np.zeros_like(signs_re)
+            tables = []
+            for c in range(self._num_chunks):
+                p_re, p_im = (p[c * self._CHUNK:(c + 1) * self._CHUNK] for p in self._preamble_signs)
+                re = signs_re @ p_re + signs_im @ p_im + 2 * self._CHUNK
+                im = signs_im @ p_re - signs_re @ p_im + 2 * self._CHUNK
+                tables.append((re.astype(np.uint32) | (im.astype(np.uint32) << 16)))
+            self._tables[is_complex] = tables
+        return self._tables[is_complex]
+
 class PreambleSync:
     """
     Frame synchronization by correlation with a preamble.
 
-    Performs a correlation with a known preamble to detect the start of a frame.
+    Performs a correlation with a known preamble to detect the start of a frame. The correlation is computed by direct convolution for short preambles and small inputs, and by overlap-save FFT otherwise.
+
+    The samples and their correlation are kept in preallocated buffers until a whole frame can be output. New samples are appended after the ones that are still needed, and those are only moved back to the start of the buffers when there's no room left at the end. Since at most :attr:`frame_size` + :math:`L` - 1 samples (where :math:`L` is the preamble length) are still needed at any time, the buffers are sized for that plus the input length, and each sample is moved at most a bounded number of times.
+
+    For complex signals, the squared magnitude of the correlation is compared with the squared :attr:`threshold`, which avoids the square root. Whether the signals are complex is decided from the type of the preamble and of the first input, not from their values. The best peak is the maximum of the correlation within :attr:`frame_size` / 2 samples of the first sample above the threshold.
+
+    :func:`__call__` outputs at most one frame per call, while :func:`call__frames` outputs every complete frame found in an input of any size. :func:`call__views` and :func:`call__offsets` avoid copying the frames, by returning read-only views into the internal buffer or only the position of the frames in the input. In all cases, the samples that may still belong to a frame are kept for the next call.
+
+    With a :attr:`coarse_threshold`, detection is done in two stages. The signs of the real and imaginary parts of the input are correlated with those of the preamble first, using bit-packed tables, and the full-precision correlation is only computed where the magnitude of this coarse correlation, relative to its value for the preamble itself, reaches :attr:`coarse_threshold`. The correlation is taken as zero elsewhere. Since the signs don't depend on the signal level, a low coarse threshold (e.g. 0.5) discards most of the noise and payload without missing preambles. This can't be combined with :attr:`FrameDetection.CFAR` detection, whose noise floor would be biased by the discarded samples. The preamble length is then limited to 16376 samples.
+
+    With :attr:`differential` correlation, the input is differentially encoded as :math:`x[n] x^*[n-1]` and correlated with the preamble encoded in the same way. A constant frequency offset then only rotates the phase of the correlation instead of smearing its peak, so frames can be detected before frequency synchronization. The correlation scales with the square of the signal level, and its peak still marks the end of the preamble.
+
+    With a :attr:`flywheel`, once that many consecutive frames are detected :attr:`frame_period` samples apart, the object is :attr:`locked` and only the samples within :attr:`flywheel_window` of the predicted correlation peaks are correlated, the correlation being taken as zero elsewhere. Each prediction follows the best sample around the previous one, so a slow drift is tracked. After :attr:`flywheel_misses` consecutive predicted peaks below the threshold, the whole signal is searched again. This can't be combined with :attr:`FrameDetection.CFAR` detection either.
+
+    With :attr:`FrameDetection.ABSOLUTE` detection, the threshold depends on the signal level, so the AGC must have settled before frames can be detected. With :attr:`FrameDetection.NORMALIZED` detection, the squared correlation is divided by the energy of the preamble and by the energy of the input over the last :math:`L` samples, which is updated in O(1) per sample with a cumulative sum. With :attr:`FrameDetection.CFAR` detection, it is divided by the mean squared correlation over :attr:`cfar_window` samples, which end :math:`L` samples before the current one so that the preamble itself isn't part of the noise floor estimate. No frame is detected during the first :attr:`cfar_window` + :math:`L` samples in this mode. For real signals, the sign of the correlation is kept in both modes.
     """
 
-    def __init__(self, preamble: np.ndarray, threshold: float, frame_size: int):
+    def __init__(self, preamble: np.ndarray, threshold: float, frame_size: int, detection: FrameDetection = None, cfar_window: int = None,
+                 coarse_threshold: float = None, differential: bool = False, flywheel: int = None, frame_period: int = None,
+                 flywheel_window: int = None, flywheel_misses: int = 3):
         """
         :param preamble: Flipped conjugate of the preamble. This array will be used as the correlation filter coefficients.
         :param threshold: Correlation threshold. Any sample where the correlation is >= than this value, will be considered the start of a frame.
         :param frame_size: Frame size (samples)
+        :param detection: What the correlation is compared with (:attr:`FrameDetection.ABSOLUTE` by default)
+        :param cfar_window: Length of the noise floor reference window of :attr:`FrameDetection.CFAR` detection (4 preamble lengths by default)
+        :param coarse_threshold: Threshold of the sign-quantized correlation for two-stage detection, relative to its value for the preamble itself. Disabled by default.
+        :param differential: Whether the differentially encoded input is correlated with the differentially encoded preamble
+        :param flywheel: Number of consecutive frames detected :attr:`frame_period` samples apart after which only the predicted frame positions are searched. Disabled by default.
+        :param frame_period: Expected distance between consecutive frames (samples), :attr:`frame_size` by default
+        :param flywheel_window: Maximum distance between a predicted correlation peak and the samples searched around it, the preamble length by default
+        :param flywheel_misses: Number of consecutive predicted frames not found after which the whole signal is searched again
         """
-        self._preamble = np.flipud(np.conj(preamble))
+        self._preamble = np.conj(preamble)[..., ::-1]
         self._threshold = threshold
         self._frame_size = frame_size
-        self._filter_state = np.zeros(len(self.preamble) - 1)
-        self._buf = np.empty(0)
-        self._xcorr = np.empty(0)
+        # Number of samples spanned by the preamble
+        self._length = self.preamble.shape[-1]
+        self._detection = FrameDetection.ABSOLUTE if detection is None else detection
+        self._coarse_threshold = coarse_threshold
+        self._differential = differential
+        if differential:
+            if self._length < 2:
+                raise ValueError(f'Invalid preamble length {self._length} for differential correlation. Must be >= 2.')
+            # Flipped conjugate of p[k + 1] * conj(p[k]), which is also
+            # c[k] * conj(c[k + 1]) for the flipped conjugate c of the preamble
+            coeffs = self.preamble[..., :-1] * np.conj(self.preamble[..., 1:])
+        else:
+            coeffs = self.preamble
+        # Last input sample, for the differential encoding
+        self._last = 0
+        if coarse_threshold is None:
+            self._correlator = StreamingFIR(coeffs)
+        elif not 0 < coarse_threshold <= 1:
+            raise ValueError(f'Invalid coarse threshold {coarse_threshold}. Must be in (0, 1].')
+        elif self.detection == FrameDetection.CFAR:
+            raise ValueError(f'Invalid detection {self.detection} with a coarse threshold. Must not be {FrameDetection.CFAR}.')
+        else:
+            self._correlator = _SignCorrelator(coeffs, coarse_threshold)
+        self._flywheel = flywheel
+        self._frame_period = frame_size if frame_period is None else frame_period
+        self._flywheel_window = self._length if flywheel_window is None else flywheel_window
+        self._flywheel_misses = flywheel_misses
+        if flywheel is not None:
+            if flywheel < 1:
+                raise ValueError(f'Invalid flywheel {flywheel}. Must be >= 1.')
+            if self.detection == FrameDetection.CFAR:
+                raise ValueError(f'Invalid detection {self.detection} with a flywheel. Must not be {FrameDetection.CFAR}.')
+            if not 0 <= self.flywheel_window < self.frame_period / 2:
+                raise ValueError(f'Invalid flywheel window {self.flywheel_window}. Must be in [0, frame_period / 2).')
+            if flywheel_misses < 1:
+                raise ValueError(f'Invalid flywheel misses {flywheel_misses}. Must be >= 1.')
+        # Consecutive frames detected at the expected distance, and the last one
+        self._fly_count = 0
+        self._fly_peak = None
+        # Predicted correlation peak, and consecutive predicted frames not found
+        self._fly_next = None
+        self._fly_missed = 0
+        # Best sample of the window around the predicted peak seen so far
+        self._fly_best = None
+        self._fly_best_metric = -np.inf
+        if cfar_window is None:
+            cfar_window = 4 * self._length
+        elif cfar_window <= 0:
+            raise ValueError(f'Invalid CFAR window {cfar_window}. Must be > 0.')
+        self._cfar_window = cfar_window
+        # Energy of the correlation coefficients, and of the last ones - 1
+        # correlated samples
+        self._preamble_energy = np.sum(np.abs(coeffs)**2)
+        self._energy_history = np.zeros(coeffs.shape[-1] - 1)
+        # Last cfar_window + L squared correlations, and number of samples seen
+        self._power_history = np.zeros(cfar_window + self._length)
+        self._power_count = 0
+        # Whether the squared magnitude of the correlation is used. For a real
+        # preamble, only from the first complex input.
+        self._magnitude = np.iscomplexobj(self.preamble)
+        # Buffers are allocated on the first call, when the input type is known.
+        # Valid samples are in [_head, _tail).
+        self._buf = None
+        self._xcorr = None
+        self._head = 0
+        self._tail = 0
+        # Number of samples discarded before _head
+        self._consumed = 0
 
 
     @property
@@ -50,53 +275,548 @@ class PreambleSync:
         """
         return self._frame_size
 
+    @property
+    def detection(self) -> FrameDetection:
+        """
+        What the correlation is compared with.
+        """
+        return self._detection
+
+    @property
+    def coarse_threshold(self) -> float:
+        """
+        Threshold of the sign-quantized correlation for two-stage detection, relative to its value for the preamble itself, or None if disabled.
+        """
+        return self._coarse_threshold
+
+    @property
+    def differential(self) -> bool:
+        """
+        Whether the differentially encoded input is correlated with the differentially encoded preamble.
+        """
+        return self._differential
+
+    @property
+    def flywheel(self) -> int:
+        """
+        Number of consecutive frames detected :attr:`frame_period` samples apart after which only the predicted frame positions are searched, or None if disabled.
+        """
+        return self._flywheel
+
+    @property
+    def frame_period(self) -> int:
+        """
+        Expected distance between consecutive frames (samples).
+        """
+        return self._frame_period
+
+    @property
+    def flywheel_window(self) -> int:
+        """
+        Maximum distance between a predicted correlation peak and the samples searched around it.
+        """
+        return self._flywheel_window
+
+    @property
+    def flywheel_misses(self) -> int:
+        """
+        Number of consecutive predicted frames not found after which the whole signal is searched again.
+        """
+        return self._flywheel_misses
+
+    @property
+    def locked(self) -> bool:
+        """
+        Whether only the predicted frame positions are searched.
+        """
+        return self.flywheel is not None and self._fly_count >= self.flywheel
+
+    def unlock(self):
+        """
+        Searches the whole signal again, until :attr:`flywheel` consecutive frames are detected.
+        """
+        self._fly_count = 0
+        self._fly_peak = None
+
+    @property
+    def cfar_window(self) -> int:
+        """
+        Length of the noise floor reference window of :attr:`FrameDetection.CFAR` detection.
+        """
+        return self._cfar_window
+
     def __call__(self, inp: np.ndarray, out: np.ndarray) -> int:
         """
         The main work function.
 
         :param inp: Input signal
-        :param out: Output signal
-        :return: 0 if OK, error code otherwise
-        """
-        # Correlate with preamble
-        xcorr, self._filter_state = signal.lfilter(self.preamble, 1, inp, zi=self._filter_state)
-        if np.any(np.iscomplex(inp)) or np.any(np.iscomplex(self.preamble)):
-            xcorr = np.abs(xcorr)
-
-        self._buf = np.hstack((self._buf, inp))
-        self._xcorr = np.hstack((self._xcorr, xcorr))
-
-        # Find indexes that exceed the threshold
-        idxs = np.where(self._xcorr >= self.threshold)[0]
-
-        if len(idxs) == 0:
-            _log.log(logging.DEBUG, 'frame not found 3')
-            return False
-
-        # Find the best index
-        best_idx = idxs[0]
-        for idx in idxs[1:]:
-            if idx - idxs[0] < (self.frame_size / 2) and self._xcorr[idx] > self._xcorr[best_idx]:
-                best_idx = idx
-
-        frame_start = best_idx - len(self.preamble) + 1
-        frame_end = frame_start + self.frame_size
-
-        if frame_start < 0:
-            self._buf = self._buf[best_idx + 1:]
-            self._xcorr = self._xcorr[best_idx + 1:]
-            # _log.debug('PreambleSync: frame_start=%d', frame_start)
-            return False
-        if frame_end > len(self._buf):
-            self._buf = self._buf[frame_start:]
-            self._xcorr = self._xcorr[frame_start:]
-            # _log.debug('PreambleSync: frame_end=%d', frame_end)
-            return False
-        out[:] = self._buf[frame_start:frame_end]
-        self._buf = self._buf[frame_end:]
-        self._xcorr = self._xcorr[frame_end:]
-        # _log.debug('PreambleSync: frame_start=%d, frame_end=%d', frame_start, frame_end)
-        return True
+        :param out: Output signal, the next frame
+        :return: Number of frames written to ``out`` (0 or 1)
+        """
+        self._correlate(inp)
+        peaks = self._detect(1, resume=False)
+        if peaks:
+            start = self._frame_start(peaks[0])
+            out[:] = self._buf[start:start + self.frame_size]
+        return len(peaks)
+
+    def call__frames(self, inp: np.ndarray, out: np.ndarray, offsets: np.ndarray = None) -> int:
+        """
+        The main work function for extracting a sequence of frames.
+
+        Every complete frame is output, up to the number of rows of ``out``. The frames that don't fit are output on the next calls.
+
+        :param inp: Input signal
+        :param out: Output frames, one per row. Its shape should be (maximum number of frames, :attr:`frame_size`).
+        :param offsets: Absolute position of the start of each output frame, counting all the samples input since the object was created
+        :return: Number of frames written to ``out``
+        """
+        return len(self._frames(inp, len(out), out, offsets))
+
+    def call__views(self, inp: np.ndarray, max_frames: int = None, offsets: np.ndarray = None) -> List[np.ndarray]:
+        """
+        The main work function for extracting a sequence of frames without copying them.
+
+        The frames are returned as read-only views into the internal buffer, which are only valid until the next call to any work function of this object: the buffer is then overwritten by the samples that are moved back to its start, and by the new input. Frames that must outlive that should be copied.
+
+        :param inp: Input signal
+        :param max_frames: Maximum number of frames to output (all by default, or as many as ``offsets`` can hold)
+        :param offsets: Absolute position of the start of each output frame, counting all the samples input since the object was created
+        :return: Output frames
+        """
+        if max_frames is None:
+            max_frames = np.inf if offsets is None else len(offsets)
+        views = []
+        for start in self._frame_start(self._frames(inp, max_frames, offsets=offsets)):
+            view = self._buf[start:start + self.frame_size]
+            view.flags.writeable = False
+            views.append(view)
+        return views
+
+    def call__offsets(self, inp: np.ndarray, offsets: np.ndarray) -> int:
+        """
+        The main work function for locating a sequence of frames, without outputting them.
+
+        Only the absolute position of the start of each frame is output, counting all the samples input since the object was created, so the caller can read the frames from its own copy of the input. Since a frame can span several inputs, the caller must keep at least the last :attr:`frame_size` + :math:`L` - 1 input samples, and more when frames are left for the next calls because ``offsets`` is full.
+
+        :param inp: Input signal
+        :param offsets: Absolute position of the start of each frame, up to the length of ``offsets``
+        :return: Number of frames written to ``offsets``
+        """
+        return len(self._frames(inp, len(offsets), offsets=offsets))
+
+    def _frames(self, inp: np.ndarray, max_frames: int, out: np.ndarray = None, offsets: np.ndarray = None) -> np.ndarray:
+        """
+        Implements the work functions that extract a sequence of frames.
+
+        :param inp: Input signal
+        :param max_frames: Maximum number of frames to detect
+        :param out: Output frames, one per row
+        :param offsets: Absolute position of the start of each output frame
+        :return: Buffer indexes of the correlation peaks of the detected frames
+        """
+        self._correlate(inp)
+        peaks = np.asarray(self._detect(max_frames), dtype=int)
+        starts = self._frame_start(peaks)
+        if out is not None and len(starts):
+            out[:len(starts)] = self._buf[starts[:, np.newaxis] + np.arange(self.frame_size)]
+        if offsets is not None:
+            # Absolute position of the start of the buffers
+            offsets[:len(starts)] = self._consumed - self._head + starts
+        return peaks
+
+    def _correlate(self, inp: np.ndarray):
+        """
+        Correlates the input signal with the preamble and appends both to the buffers.
+
+        :param inp: Input signal
+        """
+        if self.differential:
+            sig = np.empty_like(inp)
+            sig[:1] = self._last
+            sig[1:] = inp[:-1]
+            np.multiply(inp, np.conj(sig), out=sig)
+            if len(inp):
+                self._last = inp[-1]
+        else:
+            sig = inp
+        # Absolute position of the first input sample
+        start = self._consumed + self._tail - self._head
+        new = self._append(inp)
+        metric = self._xcorr[new]
+        energy = self._energy(sig) if self.detection == FrameDetection.NORMALIZED else None
+        if self.locked:
+            self._flywheel_correlate(sig, start, metric, energy)
+        else:
+            self._metric(self._correlator(sig), metric, energy)
+
+    def _flywheel_correlate(self, sig: np.ndarray, start: int, metric: np.ndarray, energy: np.ndarray):
+        """
+        Correlates the samples around the predicted correlation peaks, and searches the whole signal again after :attr:`flywheel_misses` consecutive peaks are not found.
+
+        The other samples are left out of the correlation, which is taken as zero.
+
+        :param sig: Correlated signal, the input or its differential encoding
+        :param start: Absolute position of the first input sample
+        :param metric: Stored correlation of the input
+        :param energy: Energy of the correlated signal over the preamble window, for :attr:`FrameDetection.NORMALIZED` detection
+        """
+        n = len(sig)
+        ext = self._correlator.extend(sig)
+        metric[:] = 0
+        window = self.flywheel_window
+        while self.locked:
+            center = self._fly_next - start
+            lo, hi = max(center - window, 0), min(center + window + 1, n)
+            if lo >= n:
+                break
+            if hi > lo:
+                self._metric(self._correlator.at(ext, lo, hi), metric[lo:hi], None if energy is None else energy[lo:hi])
+                best = lo + np.argmax(metric[lo:hi])
+                if metric[best] > self._fly_best_metric:
+                    self._fly_best, self._fly_best_metric = start + best, metric[best]
+            if hi < center + window + 1:
+                # The rest of the window is in the next input
+                break
+            if self._fly_best_metric >= self._detect_threshold():
+                # Follow the detected peak
+                self._fly_next = self._fly_best + self.frame_period
+                self._fly_missed = 0
+            else:
+                self._fly_next += self.frame_period
+                self._fly_missed += 1
+            self._fly_best, self._fly_best_metric = None, -np.inf
+            if self._fly_missed >= self.flywheel_misses:
+                _log.debug('PreambleSync: flywheel unlocked at %d', start + hi)
+                self.unlock()
+                self._metric(self._correlator.at(ext, hi, n), metric[hi:], None if energy is None else energy[hi:])
+
+    def _metric(self, xcorr: np.ndarray, metric: np.ndarray, energy: np.ndarray = None):
+        """
+        Computes the stored correlation.
+
+        :param xcorr: Correlation with the preamble
+        :param metric: Stored correlation
+        :param energy: Energy of the correlated signal over the preamble window, for :attr:`FrameDetection.NORMALIZED` detection
+        """
+        if self._magnitude:
+            np.add(np.square(xcorr.real), np.square(xcorr.imag), out=metric)
+        else:
+            metric[:] = xcorr.real
+        if self.detection == FrameDetection.ABSOLUTE:
+            return
+        if not self._magnitude:
+            # Squared, keeping the sign
+            metric *= np.abs(metric)
+        if self.detection == FrameDetection.NORMALIZED:
+            metric /= np.maximum(self._preamble_energy * energy, np.finfo(float).tiny)
+        else:
+            metric /= self._noise_floor(np.abs(metric))
+
+    def _energy(self, inp: np.ndarray) -> np.ndarray:
+        """
+        Energy of the correlated signal over the preamble window ending at each sample.
+
+        :param inp: Correlated signal, the input or its differential encoding
+        :return: Sum of the squared magnitude of the last :math:`L` samples, or :math:`L` - 1 with differential correlation
+        """
+        energy = np.square(inp.real)
+        if np.iscomplexobj(inp):
+            energy += np.square(inp.imag)
+        ext = np.concatenate((self._energy_history, energy))
+        self._energy_history = ext[len(inp):]
+        cumsum = np.concatenate(([0], np.cumsum(ext)))
+        # Rounding errors can make an empty window slightly negative
+        return np.maximum(cumsum[len(self._energy_history) + 1:] - cumsum[:len(inp)], 0)
+
+    def _noise_floor(self, power: np.ndarray) -> np.ndarray:
+        """
+        Mean squared correlation over the CFAR reference window of each sample.
+
+        :param power: Squared correlation magnitude
+        :return: Noise floor, or infinity where the reference window isn't full yet
+        """
+        n = len(power)
+        ext = np.concatenate((self._power_history, power))
+        self._power_history = ext[n:]
+        cumsum = np.concatenate(([0], np.cumsum(ext)))
+        # The reference window of sample i is ext[i:i + cfar_window]
+        noise = (cumsum[self.cfar_window:self.cfar_window + n] - cumsum[:n]) / self.cfar_window
+        # Until the first reference window is full
+        noise[:max(len(ext) - self._power_count - n, 0)] = np.inf
+        self._power_count += n
+        return np.maximum(noise, np.finfo(float).tiny)
+
+    def _detect_threshold(self) -> float:
+        """
+        Threshold to which the stored correlation is compared.
+
+        :return: The squared threshold for complex signals or with normalized or CFAR detection, the threshold otherwise
+        """
+        return self.threshold**2 if self._magnitude or self.detection != FrameDetection.ABSOLUTE else self.threshold
+
+    def _frame_start(self, peak):
+        """
+        Start of the frames whose preamble correlation peaks at ``peak``.
+
+        :param peak: Buffer index, or array of buffer indexes, of the correlation peaks
+        :return: Buffer indexes of the frame starts
+        """
+        return peak - self._length + 1
+
+    def _detect(self, max_frames: int, resume: bool = True) -> List[int]:
+        """
+        Detects up to ``max_frames`` complete frames in the buffers, and discards the samples that are no longer needed.
+
+        The detected frames stay in the buffers until the next call to :func:`_append`.
+
+        :param max_frames: Maximum number of frames to detect
+        :param resume: Whether to keep searching after a peak whose preamble starts before the buffered samples
+        :return: Buffer indexes of the correlation peaks of the detected frames
+        """
+        xcorr = self._xcorr[self._head:self._tail]
+        above = np.flatnonzero(xcorr >= self._detect_threshold())
+        window = (self.frame_size + 1) // 2
+        peaks = []
+        pos = 0
+        while len(peaks) < max_frames:
+            # Find the first index that exceeds the threshold
+            k = np.searchsorted(above, pos)
+            if k == len(above):
+                # A frame can't start before the last len(preamble) - 1 samples
+                pos = max(pos, len(xcorr) - self._length + 1)
+                _log.log(logging.DEBUG, 'frame not found 3')
+                break
+
+            # Find the best index. Any index below the threshold is also below
+            # the first one, so the argmax can run over the whole window.
+            first_idx = above[k]
+            best_idx = first_idx + np.argmax(xcorr[first_idx:first_idx + window])
+
+            frame_start = self._frame_start(self._head + best_idx) - self._head
+            frame_end = frame_start + self.frame_size
+            if frame_start < pos:
+                pos = best_idx + 1
+                # _log.debug('PreambleSync: frame_start=%d', frame_start)
+                if resume:
+                    continue
+                break
+            if frame_end > len(xcorr):
+                pos = frame_start
+                # _log.debug('PreambleSync: frame_end=%d', frame_end)
+                break
+            peaks.append(self._head + best_idx)
+            if self.flywheel is not None and not self.locked:
+                self._track(self._consumed + best_idx)
+            pos = frame_end
+            # _log.debug('PreambleSync: frame_start=%d, frame_end=%d', frame_start, frame_end)
+        self._head += pos
+        self._consumed += pos
+        return peaks
+
+    def _track(self, peak: int):
+        """
+        Counts the consecutive frames detected :attr:`frame_period` samples apart, and starts predicting the next ones after :attr:`flywheel` of them.
+
+        :param peak: Absolute position of the correlation peak of the detected frame
+        """
+        if self._fly_peak is not None and abs(peak - self._fly_peak - self.frame_period) <= self.flywheel_window:
+            self._fly_count += 1
+        else:
+            self._fly_count = 1
+        self._fly_peak = peak
+        if not self.locked:
+            return
+
+        # The samples correlated so far are already searched as usual
+        tail = self._consumed + self._tail - self._head
+        self._fly_next = peak + self.frame_period
+        while self._fly_next + self.flywheel_window < tail:
+            self._fly_next += self.frame_period
+        self._fly_missed = 0
+        self._fly_best, self._fly_best_metric = None, -np.inf
+        lo = max(self._fly_next - self.flywheel_window, self._consumed)
+        if lo < tail:
+            # The start of the first window is still buffered
+            xcorr = self._xcorr[lo - self._consumed + self._head:self._tail]
+            best = np.argmax(xcorr)
+            self._fly_best, self._fly_best_metric = lo + best, xcorr[best]
+        _log.debug('PreambleSync: flywheel locked at %d', peak)
+
+    def _append(self, inp: np.ndarray) -> slice:
+        """
+        Appends the input signal to the buffers, and makes room for its correlation.
+
+        The samples that are still needed are moved to the start of the buffers only when there's no room left at the end, and the buffers only grow when the input is larger than any previous one, or complex after real inputs.
+
+        :param inp: Input signal
+        :return: Buffer indexes of the appended samples
+        """
+        n = len(inp)
+        size = self._tail - self._head
+        dtype = np.result_type(inp, self.preamble if self._buf is None else self._buf)
+        if self._buf is None or size + n > len(self._buf) or dtype != self._buf.dtype:
+            capacity = 2 * (max(size, self.frame_size + self._length) + n)
+            buf = np.empty(capacity, dtype=dtype)
+            xcorr_buf = np.empty(capacity)
+            if self._buf is not None:
+                buf[:size] = self._buf[self._head:self._tail]
+                xcorr_buf[:size] = self._xcorr[self._head:self._tail]
+            if not self._magnitude and np.iscomplexobj(buf):
+                # A complex input after real ones: the stored correlation of
+                # the real samples is converted to its squared magnitude
+                self._magnitude = True
+                metric = xcorr_buf[:size]
+                convert = np.square if self.detection == FrameDetection.ABSOLUTE else np.abs
+                convert(metric, out=metric)
+                if self._fly_best is not None:
+                    self._fly_best_metric = convert(self._fly_best_metric)
+            self._buf = buf
+            self._xcorr = xcorr_buf
+            self._head, self._tail = 0, size
+        elif self._tail + n > len(self._buf):
+            self._buf[:size] = self._buf[self._head:self._tail]
+            self._xcorr[:size] = self._xcorr[self._head:self._tail]
+            self._head, self._tail = 0, size
+        new = slice(self._tail, self._tail + n)
+        self._buf[new] = inp
+        self._tail += n
+        return new
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'preamble={}, threshold={}, frame_size={}, detection={}, cfar_window={}, coarse_threshold={}, differential={}, flywheel={}, frame_period={}, flywheel_window={}, flywheel_misses={}'.format(
+            self.preamble, self.threshold, self.frame_size, self.detection, self.cfar_window, self.coarse_threshold, self.differential, self.flywheel,
+            self.frame_period, self.flywheel_window, self.flywheel_misses)
+        return '{}({})'.format(self.__class__.__name__, args)
+
+class PreambleBankSync(PreambleSync):
+    """
+    Frame synchronization by correlation with a bank of preambles.
+
+    Detects frames that start with any of several preambles, and reports which one was found. The preambles are stacked into a single matrix, zero padded to the length of the longest one, so the input is transformed only once and all the correlations are computed by a single batched FFT or matrix product.
+
+    The squared magnitude of each correlation is divided by the square of its own threshold, and the preamble with the largest normalized correlation is kept at each sample. A frame is detected where this normalized correlation is >= 1, following the same rules as :class:`PreambleSync`. Since the magnitude is used for real signals too, preambles with inverted polarity are also detected.
+
+    Example, with the Barker sequences in :data:`sksdr.UNIPOLAR_BARKER_SEQ`:
+
+    >>> import sksdr
+    >>> seqs = [sksdr.UNIPOLAR_BARKER_SEQ[n] for n in (7, 11, 13)]
+    >>> frame_sync = sksdr.PreambleBankSync.from_sequences(seqs, [6.0, 10.0, 12.0], 100)
+    """
+
+    def __init__(self, preambles: List[np.ndarray], threshold: Union[float, List[float]], frame_size: int):
+        """
+        :param preambles: Preambles, which may have different lengths
+        :param threshold: Correlation threshold, common to all the preambles or one per preamble
+        :param frame_size: Frame size (samples)
+        """
+        self._preambles = [np.asarray(p) for p in preambles]
+        self._lengths = np.array([len(p) for p in self._preambles])
+        if len(self._preambles) == 0:
+            raise ValueError('Invalid number of preambles 0. Must be > 0.')
+        # Shorter preambles are padded at their start, so their flipped
+        # conjugate is padded at its end and their correlation isn't delayed.
+        bank = np.zeros((len(self._preambles), self._lengths.max()), dtype=np.result_type(*self._preambles))
+        for p, preamble in zip(bank, self._preambles):
+            p[len(p) - len(preamble):] = preamble
+        super().__init__(bank, threshold, frame_size)
+        self._scale = 1 / np.broadcast_to(np.asarray(threshold, dtype=float)**2, (len(bank),))[:, np.newaxis]
+        # The normalized correlation is always a power, even for real inputs
+        self._magnitude = True
+        # Index of the preamble with the largest correlation at each sample
+        self._which = None
+
+    @staticmethod
+    def from_sequences(seqs: Iterable[list], threshold: Union[float, List[float]], frame_size: int):
+        """
+        Factory method to create a bank of bipolar preambles from unipolar sequences, such as the ones in :mod:`sksdr.sequences`.
+
+        :param seqs: Unipolar sequences
+        :param threshold: Correlation threshold, common to all the preambles or one per preamble
+        :param frame_size: Frame size (samples)
+        """
+        return PreambleBankSync([bipolar(seq) for seq in seqs], threshold, frame_size)
+
+    @property
+    def preambles(self) -> List[np.ndarray]:
+        """
+        Preambles.
+        """
+        return self._preambles
+
+    def call__frames(self, inp: np.ndarray, out: np.ndarray, offsets: np.ndarray = None, ids: np.ndarray = None) -> int:
+        """
+        The main work function for extracting a sequence of frames.
+
+        Every complete frame is output, up to the number of rows of ``out``. The frames that don't fit are output on the next calls.
+
+        :param inp: Input signal
+        :param out: Output frames, one per row. Its shape should be (maximum number of frames, :attr:`frame_size`).
+        :param offsets: Absolute position of the start of each output frame, counting all the samples input since the object was created
+        :param ids: Index in :attr:`preambles` of the preamble found at the start of each output frame
+        :return: Number of frames written to ``out``
+        """
+        peaks = self._frames(inp, len(out), out, offsets)
+        if ids is not None:
+            ids[:len(peaks)] = self._which[peaks]
+        return len(peaks)
+
+    def _correlate(self, inp: np.ndarray):
+        """
+        Correlates the input signal with every preamble and appends the largest normalized correlation to the buffers.
+
+        :param inp: Input signal
+        """
+        xcorr = self._correlator(inp)
+        power = np.square(xcorr.real)
+        if np.iscomplexobj(xcorr):
+            power += np.square(xcorr.imag)
+        power *= self._scale
+        new = self._append(inp)
+        which = self._which[new]
+        np.argmax(power, axis=0, out=which)
+        self._xcorr[new] = np.take_along_axis(power, which[np.newaxis], axis=0)[0]
+
+    def _detect_threshold(self) -> float:
+        """
+        Threshold to which the stored correlation is compared.
+
+        :return: 1, since the correlation is normalized by the threshold of each preamble
+        """
+        return 1.0
+
+    def _frame_start(self, peak):
+        """
+        Start of the frames whose preamble correlation peaks at ``peak``.
+
+        :param peak: Buffer index, or array of buffer indexes, of the correlation peaks
+        :return: Buffer indexes of the frame starts
+        """
+        return peak - self._lengths[self._which[peak]] + 1
+
+    def _append(self, inp: np.ndarray) -> slice:
+        """
+        Appends the input signal to the buffers, and makes room for its correlation and preamble indexes.
+
+        :param inp: Input signal
+        :return: Buffer indexes of the appended samples
+        """
+        head = self._head
+        new = super()._append(inp)
+        size = new.start - self._head
+        if self._which is None or len(self._which) != len(self._buf):
+            which = np.empty(len(self._buf), dtype=np.intp)
+            if self._which is not None:
+                which[:size] = self._which[head:head + size]
+            self._which = which
+        elif self._head != head:
+            self._which[:size] = self._which[head:head + size]
+        return new
 
     def __repr__(self):
         """
@@ -104,5 +824,5 @@ class PreambleSync:
 
         :return: A string representing the object and its properties
         """
-        args = 'preamble={}, threshold={}, frame_size={}'.format(self.preamble, self.threshold, self.frame_size)
+        args = 'preambles={}, threshold={}, frame_size={}'.format(self.preambles, self.threshold, self.frame_size)
         return '{}({})'.format(self.__class__.__name__, args)
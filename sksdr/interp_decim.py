@@ -2,16 +2,22 @@
 Interpolation and decimation algorithms.
 """
 import logging
+import math
 from typing import Tuple
 
 import numpy as np
 import scipy.signal as signal
 
+from .fir import StreamingFIR
+from .utils import cached_design
+
 _log = logging.getLogger(__name__)
 
 class FirInterpolator:
     """
     Upsamples and filters the input signal.
+
+    The filter is split into :attr:`factor` polyphase components, where component :math:`k` holds the coefficients :math:`k, k + L, k + 2L, ...` (:math:`L` being the factor). Each component filters the input at the input rate and produces every :math:`L`-th output sample, so the zeros inserted by upsampling are never multiplied, and the filter state is just the last input samples.
     """
 
     def __init__(self, factor: int, coeffs: list):
@@ -21,7 +27,12 @@ class FirInterpolator:
         """
         self._factor = factor
         self._coeffs = coeffs
-        self._filter_state = np.zeros(len(self.coeffs) - 1)
+        num_taps = -(-len(coeffs) // factor)
+        padded = np.zeros(num_taps * factor, dtype=np.result_type(np.asarray(coeffs), float))
+        padded[:len(coeffs)] = coeffs
+        # One polyphase component per row, filtered as a bank
+        self._phases = padded.reshape(num_taps, factor).T
+        self._fir = StreamingFIR(self._phases)
 
     @property
     def factor(self) -> int:
@@ -43,13 +54,14 @@ class FirInterpolator:
 
         :param inp: Input signal
         :param filtered: Filtered signal
-        :param upsampled: Upsampled signal
+        :param upsampled: Upsampled signal. It isn't needed for filtering, so it's only computed if given, for debugging.
         :return: 0 if OK, error code otherwise
         """
-        if upsampled is None:
-            upsampled = np.empty(len(inp) * self.factor, dtype=complex)
-        upsample(inp, self.factor, upsampled)
-        filtered[:], self._filter_state = signal.lfilter(self.coeffs, 1, upsampled, zi=self._filter_state)
+        if upsampled is not None:
+            upsample(inp, self.factor, upsampled)
+        # Row k holds every factor-th output, starting from output k
+        for k, out in enumerate(self._fir(inp)):
+            filtered[k:len(inp) * self.factor:self.factor] = out
         return 0
 
     def __repr__(self):
@@ -64,6 +76,10 @@ class FirInterpolator:
 class FirDecimator:
     """
     Filters and downsamples the input signal.
+
+    The filter is split into :attr:`factor` polyphase components, where component :math:`k` holds the coefficients :math:`k, k + M, k + 2M, ...` (:math:`M` being the factor), and filters the input samples whose index is :math:`-k` modulo :math:`M`. Adding up the outputs of all the components gives only the output samples that are kept.
+
+    The kept samples are those whose index is a multiple of :attr:`factor`, counting all the samples input since the object was created, so the input can be split into blocks of any length.
     """
 
     def __init__(self, factor: int, coeffs: list):
@@ -73,7 +89,12 @@ class FirDecimator:
         """
         self._factor = factor
         self._coeffs = coeffs
-        self._filter_state = np.zeros(len(self.coeffs) - 1)
+        # The full filter keeps the state, the last len(coeffs) - 1 input samples
+        self._fir = StreamingFIR(np.asarray(coeffs))
+        # One polyphase component per item, without the empty ones
+        self._phases = [(k, StreamingFIR(np.asarray(coeffs[k::factor]))) for k in range(min(factor, len(coeffs)))]
+        # Index of the next kept sample in the next input
+        self._phase = 0
 
     @property
     def factor(self) -> int:
@@ -94,15 +115,31 @@ class FirDecimator:
         The main work function.
 
         :param inp: Input signal
-        :param downsampled: Upsampled signal
-        :param filtered: Filtered signal
-        :return: 0 if OK, error code otherwise
+        :param downsampled: Downsampled signal. Its length should be at least ``ceil(len(inp) / factor)``.
+        :param filtered: Filtered signal. It isn't needed for downsampling, so it's only computed if given, for debugging.
+        :return: Number of samples written to ``downsampled``, which is ``len(inp) / factor`` if the length of every input is a multiple of the factor
         """
-        if filtered is None:
-            filtered = np.empty(len(inp), dtype=complex)
-        filtered[:], self._filter_state = signal.lfilter(self.coeffs, 1, inp, zi=self._filter_state)
-        downsample(filtered, self.factor, downsampled)
-        return 0
+        n = len(inp)
+        ext = self._fir.extend(inp)
+        if filtered is not None:
+            filtered[:n] = self._fir.at(ext, 0, n)
+        count = len(range(self._phase, n, self.factor))
+        # Position in ext of the newest sample used by the first kept output
+        last = self._phase + len(self.coeffs) - 1
+        self._phase = (self._phase - n) % self.factor
+        if count == 0:
+            return 0
+
+        out = downsampled[:count]
+        for k, fir in self._phases:
+            num_taps = len(fir.coeffs)
+            start = last - k - (num_taps - 1) * self.factor
+            stream = ext[start:start + (count + num_taps - 1) * self.factor:self.factor]
+            if k == 0:
+                out[:] = fir.at(stream, 0, count)
+            else:
+                out += fir.at(stream, 0, count)
+        return count
 
     def __repr__(self):
         """
@@ -113,6 +150,593 @@ class FirDecimator:
         args = 'factor={}, coeffs={}'.format(self.factor, self.coeffs)
         return '{}({})'.format(self.__class__.__name__, args)
 
+class HalfbandDecimator:
+    """
+    Decimates the input signal by a power of two, with a cascade of half-band filters.
+
+    Each of the :attr:`num_stages` stages filters with a half-band filter and downsamples by 2. A half-band filter has :math:`4K - 1` coefficients, and those at an even distance from the center one are zero, so in polyphase form one component holds the :math:`2K` nonzero coefficients and the other only the center one, which is half: each output costs :math:`2K` multiply-accumulates and one multiplication, for a filter :math:`4K - 1` long. A short filter is enough for each stage, since only the band that aliases onto the final output band needs to be rejected, so the total cost is lower than that of a single long filter at the input rate, and stays below twice that of the first stage whatever the number of stages.
+
+    The kept samples of each stage are those whose index is a multiple of 2, counting all the samples input since the object was created, so the input can be split into blocks of any length. It's meant to be followed by a :class:`FirDecimator` with the matched filter.
+    """
+
+    def __init__(self, num_stages: int, coeffs: list = None):
+        """
+        :param num_stages: Number of decimate-by-2 stages
+        :param coeffs: Half-band filter coefficients of every stage. Their number must be 3 modulo 4, and the coefficients at an even distance from the center one are taken as zero. By default, designed by :func:`halfband_filter`.
+        """
+        if num_stages < 1:
+            raise ValueError(f'Invalid number of stages {num_stages}. Must be at least 1.')
+        if coeffs is None:
+            coeffs = halfband_filter()
+        if len(coeffs) % 4 != 3:
+            raise ValueError(f'Invalid number of coefficients {len(coeffs)}. Must be 3 modulo 4.')
+        self._num_stages = num_stages
+        self._coeffs = coeffs
+        # The polyphase components: the even coefficients, and the center one
+        self._fir = StreamingFIR(np.asarray(coeffs[::2]))
+        self._center = coeffs[len(coeffs) // 2]
+        # Last len(coeffs) - 1 input samples of each stage, and index of
+        # its next kept sample in the next input
+        self._tails = [np.zeros(len(coeffs) - 1) for _ in range(num_stages)]
+        self._phases = [0] * num_stages
+
+    @property
+    def num_stages(self) -> int:
+        """
+        Number of decimate-by-2 stages.
+        """
+        return self._num_stages
+
+    @property
+    def factor(self) -> int:
+        """
+        Decimation factor, ``2**num_stages``.
+        """
+        return 2**self.num_stages
+
+    @property
+    def coeffs(self) -> list:
+        """
+        Half-band filter coefficients of every stage.
+        """
+        return self._coeffs
+
+    def __call__(self, inp: np.ndarray, out: np.ndarray) -> int:
+        """
+        The main work function.
+
+        :param inp: Input signal
+        :param out: Decimated signal. Its length should be at least ``ceil(len(inp) / factor)``.
+        :return: Number of samples written to ``out``, which is ``len(inp) / factor`` if the length of every input is a multiple of the factor
+        """
+        num_even = len(self._fir.coeffs)
+        for stage in range(self.num_stages):
+            n = len(inp)
+            ext = np.concatenate((self._tails[stage], inp))
+            self._tails[stage] = ext[n:]
+            phase = self._phases[stage]
+            count = len(range(phase, n, 2))
+            self._phases[stage] = (phase - n) % 2
+            # Kept output j is at ext[len(coeffs) - 1 + phase + 2 * j]
+            inp = self._fir.at(ext[phase::2], 0, count)
+            inp += self._center * ext[phase + num_even - 1::2][:count]
+        out[:len(inp)] = inp
+        return len(inp)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'num_stages={}, coeffs={}'.format(self.num_stages, self.coeffs)
+        return '{}({})'.format(self.__class__.__name__, args)
+
+class CicDecimator:
+    """
+    Decimates the input signal with a cascaded integrator-comb (CIC) filter.
+
+    The :attr:`num_stages` integrators run at the input rate, the signal is downsampled by :attr:`factor`, and the :attr:`num_stages` combs, which subtract the sample :attr:`delay` samples before, run at the output rate. The filter response is that of :attr:`num_stages` moving averages of ``factor * delay`` samples, but without any multiplication, so the cost per input sample doesn't depend on the factor.
+
+    The input is quantized to fixed point with :attr:`frac_bits` fractional bits, and the integrators and combs use wrapped 64-bit integer arithmetic: the integrators overflow, but the combs undo it exactly, as long as the output fits. The output is scaled back to unit DC gain. Since the filter droops in the passband, it's normally followed by a short FIR filter designed by :func:`cic_compensation_filter`, at the output rate.
+
+    The kept samples are those whose index is a multiple of :attr:`factor`, counting all the samples input since the object was created, so the input can be split into blocks of any length.
+    """
+
+    def __init__(self, factor: int, num_stages: int = 3, delay: int = 1, frac_bits: int = None):
+        """
+        :param factor: Decimation factor
+        :param num_stages: Number of integrator and comb stages
+        :param delay: Differential delay of the combs, in output samples
+        :param frac_bits: Number of fractional bits of the input. The real and imaginary parts of the input must be below ``2**(62 - frac_bits - growth)`` in magnitude, where ``growth = num_stages * ceil(log2(factor * delay))``. By default, ``60 - growth``, for inputs below 4.
+        """
+        self._factor = factor
+        self._num_stages = num_stages
+        self._delay = delay
+        self._frac_bits = _frac_bits(factor, num_stages, delay, frac_bits)
+        self._gain = float(factor * delay)**num_stages * 2.0**self._frac_bits
+        # Integrator and comb states, with a column for the real part and another for the imaginary one
+        self._integrators = np.zeros((num_stages, 2), dtype=np.int64)
+        self._combs = np.zeros((num_stages, delay, 2), dtype=np.int64)
+        # Index of the next kept sample in the next input
+        self._phase = 0
+
+    @property
+    def factor(self) -> int:
+        """
+        Decimation factor.
+        """
+        return self._factor
+
+    @property
+    def num_stages(self) -> int:
+        """
+        Number of integrator and comb stages.
+        """
+        return self._num_stages
+
+    @property
+    def delay(self) -> int:
+        """
+        Differential delay of the combs, in output samples.
+        """
+        return self._delay
+
+    @property
+    def frac_bits(self) -> int:
+        """
+        Number of fractional bits of the input.
+        """
+        return self._frac_bits
+
+    def __call__(self, inp: np.ndarray, out: np.ndarray) -> int:
+        """
+        The main work function.
+
+        :param inp: Input signal
+        :param out: Decimated signal. Its length should be at least ``ceil(len(inp) / factor)``.
+        :return: Number of samples written to ``out``, which is ``len(inp) / factor`` if the length of every input is a multiple of the factor
+        """
+        n = len(inp)
+        acc = _quantize(inp, self.frac_bits)
+        cols = acc.shape[1]
+        if n:
+            for integrator in self._integrators:
+                # The state is carried by the first sum
+                acc[0] += integrator[:cols]
+                np.cumsum(acc, axis=0, out=acc)
+                integrator[:cols] = acc[-1]
+        acc = acc[self._phase::self.factor]
+        self._phase = (self._phase - n) % self.factor
+        for comb in self._combs:
+            acc = _comb(acc, comb[:, :cols])
+        return _dequantize(acc, self._gain, out)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'factor={}, num_stages={}, delay={}, frac_bits={}'.format(self.factor, self.num_stages, self.delay, self.frac_bits)
+        return '{}({})'.format(self.__class__.__name__, args)
+
+class CicInterpolator:
+    """
+    Interpolates the input signal with a cascaded integrator-comb (CIC) filter.
+
+    The :attr:`num_stages` combs, which subtract the sample :attr:`delay` samples before, run at the input rate, the signal is upsampled by :attr:`factor`, and the :attr:`num_stages` integrators run at the output rate. The filter response is that of :attr:`num_stages` moving averages of ``factor * delay`` samples, but without any multiplication, so the cost per output sample doesn't depend on the factor.
+
+    The input is quantized to fixed point with :attr:`frac_bits` fractional bits, and the combs and integrators use wrapped 64-bit integer arithmetic, as in :class:`CicDecimator`. The output is scaled back to unit DC gain. Since the filter droops in the passband, it's normally preceded by a short FIR filter designed by :func:`cic_compensation_filter`, at the input rate.
+    """
+
+    def __init__(self, factor: int, num_stages: int = 3, delay: int = 1, frac_bits: int = None):
+        """
+        :param factor: Interpolation factor
+        :param num_stages: Number of comb and integrator stages
+        :param delay: Differential delay of the combs, in input samples
+        :param frac_bits: Number of fractional bits of the input. The real and imaginary parts of the input must be below ``2**(62 - frac_bits - growth)`` in magnitude, where ``growth = num_stages * ceil(log2(factor * delay))``. By default, ``60 - growth``, for inputs below 4.
+        """
+        self._factor = factor
+        self._num_stages = num_stages
+        self._delay = delay
+        self._frac_bits = _frac_bits(factor, num_stages, delay, frac_bits)
+        self._gain = float(factor * delay)**num_stages / factor * 2.0**self._frac_bits
+        # Comb and integrator states, with a column for the real part and another for the imaginary one
+        self._combs = np.zeros((num_stages, delay, 2), dtype=np.int64)
+        self._integrators = np.zeros((num_stages, 2), dtype=np.int64)
+
+    @property
+    def factor(self) -> int:
+        """
+        Interpolation factor.
+        """
+        return self._factor
+
+    @property
+    def num_stages(self) -> int:
+        """
+        Number of comb and integrator stages.
+        """
+        return self._num_stages
+
+    @property
+    def delay(self) -> int:
+        """
+        Differential delay of the combs, in input samples.
+        """
+        return self._delay
+
+    @property
+    def frac_bits(self) -> int:
+        """
+        Number of fractional bits of the input.
+        """
+        return self._frac_bits
+
+    def __call__(self, inp: np.ndarray, out: np.ndarray) -> int:
+        """
+        The main work function.
+
+        :param inp: Input signal
+        :param out: Interpolated signal. Its length should be at least ``len(inp) * factor``.
+        :return: Number of samples written to ``out``, ``len(inp) * factor``
+        """
+        acc = _quantize(inp, self.frac_bits)
+        cols = acc.shape[1]
+        for comb in self._combs:
+            acc = _comb(acc, comb[:, :cols])
+        upsampled = np.zeros((len(acc) * self.factor, cols), dtype=np.int64)
+        upsampled[::self.factor] = acc
+        if len(upsampled):
+            for integrator in self._integrators:
+                # The state is carried by the first sum
+                upsampled[0] += integrator[:cols]
+                np.cumsum(upsampled, axis=0, out=upsampled)
+                integrator[:cols] = upsampled[-1]
+        return _dequantize(upsampled, self._gain, out)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'factor={}, num_stages={}, delay={}, frac_bits={}'.format(self.factor, self.num_stages, self.delay, self.frac_bits)
+        return '{}({})'.format(self.__class__.__name__, args)
+
+def _frac_bits(factor: int, num_stages: int, delay: int, frac_bits: int = None) -> int:
+    """
+    Validates the number of fractional bits of a CIC filter input.
+
+    :param factor: Decimation or interpolation factor
+    :param num_stages: Number of stages
+    :param delay: Differential delay of the combs
+    :param frac_bits: Number of fractional bits, or None for the default
+    :return: Number of fractional bits, leaving room for the bit growth of the filter and inputs below 4
+    """
+    growth = num_stages * math.ceil(math.log2(factor * delay))
+    if frac_bits is None:
+        return 60 - growth
+    if not 0 <= frac_bits <= 60 - growth:
+        raise ValueError(f'Invalid number of fractional bits {frac_bits}. Must be between 0 and {60 - growth}.')
+    return frac_bits
+
+def _quantize(inp: np.ndarray, frac_bits: int) -> np.ndarray:
+    """
+    Quantizes a signal to fixed point.
+
+    :param inp: Input signal
+    :param frac_bits: Number of fractional bits
+    :return: One row per sample, with the real part, and the imaginary part if the input is complex
+    """
+    inp = np.asarray(inp)
+    parts = np.stack((inp.real, inp.imag), axis=-1) if np.iscomplexobj(inp) else inp[:, np.newaxis].astype(float)
+    parts *= 2.0**frac_bits
+    return np.rint(parts, out=parts).astype(np.int64)
+
+def _dequantize(acc: np.ndarray, gain: float, out: np.ndarray) -> int:
+    """
+    Scales a fixed point signal back.
+
+    :param acc: One row per sample, as returned by :func:`_quantize`
+    :param gain: Gain to divide by, including the fractional bits
+    :param out: Output signal
+    :return: Number of samples written to ``out``
+    """
+    if acc.shape[1] == 2:
+        out[:len(acc)] = acc[:, 0] / gain + 1j * (acc[:, 1] / gain)
+    else:
+        out[:len(acc)] = acc[:, 0] / gain
+    return len(acc)
+
+def _comb(acc: np.ndarray, state: np.ndarray) -> np.ndarray:
+    """
+    Subtracts from each sample the sample ``len(state)`` samples before, with wrapped integer arithmetic.
+
+    :param acc: One row per sample
+    :param state: Last input rows, updated in place
+    :return: Comb output
+    """
+    delay = len(state)
+    ext = np.concatenate((state, acc))
+    state[:] = ext[len(acc):]
+    return ext[delay:] - ext[:-delay]
+
+class FirResampler:
+    r"""
+    Resamples the input signal by a rational factor, :attr:`interpolation` / :attr:`decimation`.
+
+    This is equivalent to upsampling by :math:`L` (:attr:`interpolation`), filtering and downsampling by :math:`M` (:attr:`decimation`), but only the output samples are computed, each from a single polyphase component of the filter at the input rate. Output :math:`m` uses component :math:`k = mM \bmod L`, which holds the coefficients :math:`k, k + L, k + 2L, ...`, and ends at input :math:`\lfloor mM / L \rfloor`. The outputs that use the same component are :math:`L` apart, and their inputs are :math:`M` apart, so each component is applied to all of them at once.
+
+    The outputs are those of the upsampled signal whose index is a multiple of :math:`M`, counting all the samples input since the object was created, so the input can be split into blocks of any length.
+
+    Without coefficients, :math:`L` and :math:`M` are divided by their greatest common divisor, and the anti-aliasing filter is designed by :func:`resampling_filter`.
+    """
+
+    def __init__(self, interpolation: int, decimation: int, coeffs: list = None):
+        """
+        :param interpolation: Interpolation factor
+        :param decimation: Decimation factor
+        :param coeffs: Filter coefficients, at the upsampled rate. By default, designed by :func:`resampling_filter`.
+        """
+        if coeffs is None:
+            gcd = math.gcd(interpolation, decimation)
+            interpolation, decimation = interpolation // gcd, decimation // gcd
+            coeffs = resampling_filter(interpolation, decimation)
+        self._interpolation = interpolation
+        self._decimation = decimation
+        self._coeffs = coeffs
+        num_taps = -(-len(coeffs) // interpolation)
+        padded = np.zeros(num_taps * interpolation, dtype=np.result_type(np.asarray(coeffs), float))
+        padded[:len(coeffs)] = coeffs
+        # One flipped polyphase component per row
+        self._phases = padded.reshape(num_taps, interpolation).T[:, ::-1].copy()
+        self._filter_state = np.zeros(num_taps - 1)
+        # Index of the next output in the upsampled signal, relative to the next input
+        self._offset = 0
+
+    @property
+    def interpolation(self) -> int:
+        """
+        Interpolation factor.
+        """
+        return self._interpolation
+
+    @property
+    def decimation(self) -> int:
+        """
+        Decimation factor.
+        """
+        return self._decimation
+
+    @property
+    def coeffs(self) -> list:
+        """
+        Filter coefficients, at the upsampled rate.
+        """
+        return self._coeffs
+
+    def __call__(self, inp: np.ndarray, out: np.ndarray) -> int:
+        """
+        The main work function.
+
+        :param inp: Input signal
+        :param out: Resampled signal. Its length should be at least ``ceil(len(inp) * interpolation / decimation)``.
+        :return: Number of samples written to ``out``
+        """
+        n = len(inp)
+        ext = np.concatenate((self._filter_state, inp))
+        self._filter_state = ext[n:]
+        count = max(-(-(n * self.interpolation - self._offset) // self.decimation), 0)
+        if count:
+            num_taps = self._phases.shape[1]
+            windows = np.lib.stride_tricks.as_strided(ext, (len(ext) - num_taps + 1, num_taps), ext.strides * 2, writeable=False)
+            for j in range(min(self.interpolation, count)):
+                t = self._offset + j * self.decimation
+                rows = windows[t // self.interpolation::self.decimation][:len(range(j, count, self.interpolation))]
+                out[j:count:self.interpolation] = rows @ self._phases[t % self.interpolation]
+        self._offset += count * self.decimation - n * self.interpolation
+        return count
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'interpolation={}, decimation={}, coeffs={}'.format(self.interpolation, self.decimation, self.coeffs)
+        return '{}({})'.format(self.__class__.__name__, args)
+
+class FarrowResampler:
+    r"""
+    Resamples the input signal by an arbitrary ratio, with a Farrow structure interpolator.
+
+    The ratio of the output rate to the input rate, :attr:`ratio`, doesn't have to be rational, and can vary from one input sample to the next, given as a trajectory. Input :math:`n` is at time :math:`n`, and the number of outputs up to time :math:`t` grows by the ratio per unit of time, so output :math:`m` is at the time :math:`t_m` where it reaches :math:`m`, counting all the samples input and output since the object was created. The output is the input interpolated at :math:`t_m - D`, where the delay :math:`D` is ``order // 2 + 1`` input samples, so that the interpolator only uses samples that have already been input.
+
+    The interpolator is a polynomial of the fractional interval :math:`\mu`, whose coefficients are linear combinations of ``order + 1`` input samples around the interval, given by the rows of a matrix: a Lagrange polynomial for odd orders, or the piecewise parabolic interpolator of :class:`SymbolSync` for order 2. All the outputs of a block are computed at once: the polynomials giving the weight of each sample are evaluated by Horner's method for all the outputs, and the weighted samples are added up.
+    """
+
+    def __init__(self, ratio: float, order: int = 3):
+        """
+        :param ratio: Resampling ratio, the output rate divided by the input rate
+        :param order: Order of the interpolating polynomial: 2, or an odd number
+        """
+        self.ratio = ratio
+        self._order = order
+        self._coeffs = farrow_coeffs(order)
+        self._history = np.zeros(self._coeffs.shape[1] - 1)
+        # Number of outputs up to the next input, minus the index of the next
+        # output, between -1 (excluded) and 0
+        self._level = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """
+        Resampling ratio, the output rate divided by the input rate.
+        """
+        return self._ratio
+
+    @ratio.setter
+    def ratio(self, value: float):
+        if value <= 0:
+            raise ValueError(f'Invalid ratio {value}. Must be positive.')
+        self._ratio = value
+
+    @property
+    def order(self) -> int:
+        """
+        Order of the interpolating polynomial.
+        """
+        return self._order
+
+    def __call__(self, inp: np.ndarray, out: np.ndarray, ratio: np.ndarray = None) -> int:
+        """
+        The main work function.
+
+        :param inp: Input signal
+        :param out: Resampled signal. Its length should be at least ``ceil(sum(ratio)) + 1``, with the ratio of every input sample.
+        :param ratio: Ratio trajectory, the resampling ratio from each input sample to the next one. By default, :attr:`ratio` for every input sample.
+        :return: Number of samples written to ``out``
+        """
+        n = len(inp)
+        ratio = np.broadcast_to(self.ratio if ratio is None else ratio, (n,))
+        if np.any(ratio <= 0):
+            raise ValueError(f'Invalid ratio {ratio[ratio <= 0][0]}. Must be positive.')
+        ext = np.concatenate((self._history, inp))
+        self._history = ext[n:]
+        # Number of outputs up to each input, and to the next one
+        levels = np.empty(n + 1)
+        levels[0] = self._level
+        np.cumsum(ratio, out=levels[1:])
+        levels[1:] += self._level
+        count = max(math.ceil(levels[-1]), 0)
+        self._level = levels[-1] - count
+        if count == 0:
+            return 0
+
+        # Input k such that output m is between inputs k and k + 1, and fractional interval
+        k = np.repeat(np.arange(n), np.diff(np.ceil(levels)).astype(int))
+        mu = np.arange(count) - levels[k]
+        mu /= ratio[k]
+        # The samples around the interval from input k - D to the next one,
+        # D being half their number, start at ext[k]. The weight of each
+        # sample is a polynomial of mu, evaluated by Horner's method.
+        res = np.zeros(count, dtype=np.result_type(ext, float))
+        for j, column in enumerate(self._coeffs.T):
+            weight = np.full(count, column[-1])
+            for c in column[-2::-1]:
+                weight *= mu
+                weight += c
+            res += weight * ext[k + j]
+        out[:count] = res
+        return count
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+
+        :return: A string representing the object and its properties
+        """
+        args = 'ratio={}, order={}'.format(self.ratio, self.order)
+        return '{}({})'.format(self.__class__.__name__, args)
+
+@cached_design
+def resampling_filter(interpolation: int, decimation: int, half_len: int = 10, beta: float = 5.0) -> np.ndarray:
+    """
+    Designs the anti-aliasing filter of a rational resampler.
+
+    A Kaiser window lowpass filter, with a cutoff at the lowest of the input and output Nyquist frequencies, and a gain of ``interpolation`` to compensate for upsampling.
+
+    :param interpolation: Interpolation factor
+    :param decimation: Decimation factor
+    :param half_len: Half the filter length, in samples at the lowest of the input and output rates
+    :param beta: Kaiser window shape parameter
+    :return: Filter coefficients, at the upsampled rate
+    """
+    max_factor = max(interpolation, decimation)
+    coeffs = signal.firwin(2 * half_len * max_factor + 1, 1 / max_factor, window=('kaiser', beta)) * interpolation
+    return coeffs
+
+@cached_design
+def halfband_filter(num_taps: int = 19, beta: float = 5.0) -> np.ndarray:
+    """
+    Designs a half-band lowpass filter.
+
+    A Kaiser window lowpass filter with a cutoff at half the Nyquist frequency, where the coefficients at an even distance from the center one are exactly zero, the center one is 0.5 and the gain at DC is 1.
+
+    :param num_taps: Number of coefficients. It must be 3 modulo 4, so that the first and last coefficients aren't zero.
+    :param beta: Kaiser window shape parameter
+    :return: Filter coefficients
+    """
+    if num_taps % 4 != 3:
+        raise ValueError(f'Invalid number of coefficients {num_taps}. Must be 3 modulo 4.')
+    center = num_taps // 2
+    coeffs = 0.5 * np.sinc((np.arange(num_taps) - center) / 2) * signal.windows.kaiser(num_taps, beta)
+    # The center index is odd, and the other odd indexes are at an even distance from it
+    coeffs[1::2] = 0
+    coeffs[::2] *= 0.5 / np.sum(coeffs[::2])
+    coeffs[center] = 0.5
+    return coeffs
+
+@cached_design
+def cic_compensation_filter(factor: int, num_stages: int = 3, delay: int = 1, num_taps: int = None, cutoff: float = None, beta: float = 5.0) -> np.ndarray:
+    """
+    Designs a filter that compensates the passband droop of a CIC filter.
+
+    The response is the inverse of that of the CIC filter up to ``cutoff``, and zero above, designed by frequency sampling with a Kaiser window. The CIC response has its first null at ``2 / delay``, so the cutoff must be below it.
+
+    :param factor: Decimation or interpolation factor of the CIC filter
+    :param num_stages: Number of stages of the CIC filter
+    :param delay: Differential delay of the CIC filter
+    :param num_taps: Number of coefficients. By default, ``30 * delay + 1``, since the passband narrows with the delay.
+    :param cutoff: Passband edge, relative to the Nyquist frequency at the low rate of the CIC filter. By default, ``0.5 / delay``, a quarter of the way to the first null.
+    :param beta: Kaiser window shape parameter
+    :return: Filter coefficients, at the low rate of the CIC filter
+    """
+    if num_taps is None:
+        num_taps = 30 * delay + 1
+    if cutoff is None:
+        cutoff = 0.5 / delay
+    if not 0 < cutoff < 2 / delay:
+        raise ValueError(f'Invalid cutoff {cutoff}. Must be between 0 and the first null of the CIC filter, {2 / delay}.')
+    freqs = np.linspace(0, 1, 513)
+    # Response of num_stages moving averages of factor * delay samples, at
+    # the low rate: the combs have nulls every 2 / delay, and the
+    # integrators a pole at DC only
+    response = np.abs(np.sinc(delay * freqs / 2) / np.sinc(freqs / 2 / factor))**num_stages
+    gains = np.zeros(len(freqs))
+    passband = freqs <= cutoff
+    gains[passband] = 1 / response[passband]
+    coeffs = signal.firwin2(num_taps, freqs, gains, window=('kaiser', beta))
+    return coeffs
+
+@cached_design
+def farrow_coeffs(order: int = 3) -> np.ndarray:
+    r"""
+    Computes the coefficients of a Farrow structure interpolator.
+
+    The interpolator uses the ``order + 1`` samples :math:`x_{-(order - 1) / 2}, ..., x_{(order + 1) / 2}` around the interval from :math:`x_0` to :math:`x_1`, and its output at the fractional interval :math:`\mu` is :math:`\sum_i \mu^i c_i \cdot x`, :math:`c_i` being row :math:`i`. For an odd order, it's the Lagrange polynomial through the samples. For order 2, it's the piecewise parabolic interpolator with :math:`\alpha = 0.5` used by :class:`SymbolSync`, which uses 4 samples like order 3.
+
+    :param order: Order of the polynomial: 2, or an odd number
+    :return: Coefficients, one row per power of :math:`\mu`, in increasing order, and one column per sample
+    """
+    if order == 2:
+        alpha = 0.5
+        coeffs = np.array([
+            [     0,         1,         0,      0],
+            [-alpha, alpha - 1, 1 + alpha, -alpha],
+            [ alpha,    -alpha,    -alpha,  alpha]])
+    elif order > 0 and order % 2 == 1:
+        points = np.arange(order + 1) - (order - 1) // 2
+        coeffs = np.empty((order + 1, order + 1))
+        for j, p in enumerate(points):
+            others = np.delete(points, j)
+            coeffs[:, j] = np.poly(others)[::-1] / np.prod(p - others)
+    else:
+        raise ValueError(f'Invalid order {order}. Must be 2 or odd.')
+    return coeffs
+
 def upsample(inp: np.ndarray, factor: int, out: np.ndarray):
     """
     Upsamples an input signal.
@@ -121,10 +745,8 @@ def upsample(inp: np.ndarray, factor: int, out: np.ndarray):
     :param factor: Upsampling factor
     :param out: Upsampled output signal
     """
+    out[:] = 0
     out[::factor] = inp
-    zero_array = np.zeros(len(inp), dtype=complex)
-    for i in range(1, factor):
-        out[i::factor] = zero_array
 
 def downsample(inp: np.ndarray, factor: int, out: np.ndarray):
     """
@@ -5,8 +5,11 @@ import logging
 
 import numpy as np
 
+from .utils import cached_design
+
 _log = logging.getLogger(__name__)
 
+@cached_design
 def rrc(sps: int, rolloff: float, span: int) -> np.ndarray:
     """
     Returns the root raised cosine filter coefficients.
@@ -18,23 +21,62 @@ def rrc(sps: int, rolloff: float, span: int) -> np.ndarray:
     """
     # Design the filter
     n = np.arange(-span * sps / 2, span * sps / 2 + 1)
-    b = np.zeros(len(n))
     sps *= 1.0
     a = rolloff
-    for i, v in enumerate(n):
-        if abs(1 - 16 * a**2 * (v / sps)**2) <= np.finfo(np.float).eps / 2:
-            b[i] = 1 / 2.0 * ((1 + a) * np.sin((1 + a) * np.pi / (4.0 * a)) - (1 - a) * np.cos((1 - a) * np.pi / (4.0 * a)) + (4 * a) / np.pi * np.sin((1 - a) * np.pi / (4.0 * a)))
-        else:
-            b[i] = 4 * a / (np.pi * (1 - 16 * a**2 * (v / sps)**2))
-            b[i] = b[i] * (np.cos((1 + a) * np.pi * v / sps) + np.sinc((1 - a) * v / sps) * (1 - a) * np.pi / (4.0 * a))
+    den = 1 - 16 * a**2 * (n / sps)**2
+    # The formula is singular at n = +-sps / (4 * rolloff)
+    singular = np.abs(den) <= np.finfo(float).eps / 2
+    m = n[~singular]
+    b = np.empty(len(n))
+    b[singular] = 1 / 2.0 * ((1 + a) * np.sin((1 + a) * np.pi / (4.0 * a)) - (1 - a) * np.cos((1 - a) * np.pi / (4.0 * a)) + (4 * a) / np.pi * np.sin((1 - a) * np.pi / (4.0 * a)))
+    b[~singular] = 4 * a / (np.pi * den[~singular]) * (np.cos((1 + a) * np.pi * m / sps) + np.sinc((1 - a) * m / sps) * (1 - a) * np.pi / (4.0 * a))
 
     # Make it a unit energy pulse
-    energy = np.sum(b**2)
-    return b / np.sqrt(energy)
+    return b / np.sqrt(np.sum(b**2))
+
+@cached_design
+def raised_cosine(sps: int, rolloff: float, span: int) -> np.ndarray:
+    """
+    Returns the raised cosine filter coefficients.
+
+    The filter is normalized to unit energy, like :func:`rrc`.
+
+    :param sps: Samples per symbol
+    :param rolloff: Rolloff factor
+    :param span: Span (symbols)
+    :return: Coefficients of the filter
+    """
+    t = np.arange(-span * sps / 2, span * sps / 2 + 1) / sps
+    den = 1 - (2 * rolloff * t)**2
+    # The formula is singular at t = +-1 / (2 * rolloff)
+    singular = np.abs(den) <= np.finfo(float).eps / 2
+    b = np.empty(len(t))
+    b[singular] = np.pi / 4 * np.sinc(1 / (2 * rolloff))
+    b[~singular] = np.sinc(t[~singular]) * np.cos(np.pi * rolloff * t[~singular]) / den[~singular]
+    return b / np.sqrt(np.sum(b**2))
+
+@cached_design
+def gaussian(sps: int, bt: float, span: int) -> np.ndarray:
+    """
+    Returns the Gaussian filter coefficients, as used by GMSK.
+
+    The filter is normalized to unit DC gain.
+
+    :param sps: Samples per symbol
+    :param bt: 3 dB bandwidth-symbol time product
+    :param span: Span (symbols)
+    :return: Coefficients of the filter
+    """
+    t = np.arange(-span * sps / 2, span * sps / 2 + 1) / sps
+    alpha = np.sqrt(np.log(2) / 2) / bt
+    b = np.exp(-(np.pi * t / alpha)**2)
+    return b / np.sum(b)
 
 class RRCPulse:
     """
     A class to encapsulate :func:`rrc`.
+
+    The coefficients come from the cache of :func:`rrc`, so they're shared with every other pulse with the same parameters, and read-only.
     """
 
     def __init__(self, sps: int, rolloff: float, span:int):
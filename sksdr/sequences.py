@@ -3,6 +3,8 @@ Sequences.
 """
 import logging
 
+import numpy as np
+
 _log = logging.getLogger(__name__)
 
 UNIPOLAR_BARKER_SEQ = {
@@ -17,3 +19,12 @@ UNIPOLAR_BARKER_SEQ = {
 """
 Barker sequences.
 """
+
+def bipolar(seq: list) -> np.ndarray:
+    """
+    Maps a unipolar sequence of 0s and 1s to a bipolar sequence of -1s and 1s.
+
+    :param seq: Unipolar sequence
+    :return: Bipolar sequence
+    """
+    return 2 * np.asarray(seq, dtype=float) - 1
@@ -1,14 +1,32 @@
 """
 Utilities.
 """
+import functools
 import logging
 from enum import Enum
-from typing import Tuple
+from typing import Callable, Tuple
 
 import numpy as np
 
 _log = logging.getLogger(__name__)
 
+def cached_design(func: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+    """
+    Decorates a function that designs an array, such as filter coefficients, from hashable parameters.
+
+    The last 64 designs are cached, and the returned arrays are read-only, since they're shared by every caller.
+
+    :param func: Design function
+    :return: Cached design function
+    """
+    @functools.lru_cache(maxsize=64)
+    @functools.wraps(func)
+    def design(*args, **kwargs):
+        coeffs = func(*args, **kwargs)
+        coeffs.flags.writeable = False
+        return coeffs
+    return design
+
 def power(inp: np.ndarray) -> float:
     """
     Computes the average power of the input signal.
@@ -1,15 +1,13 @@
 import logging
+import tracemalloc
 
 import numpy as np
+import pytest
 import sksdr
 
 _log = logging.getLogger(__name__)
 
-def _test_coarse_freq_comp():
-    mod = sksdr.QPSK
-    sample_rate = 200.0e3
-    resolution = 25.0
-
+def _vectors():
     in_frame = np.array([
        -0.00001940952177043791-0.000015698909952685536j,
         0.00047383661248221425+0.00001394654154892672j ,
@@ -414,6 +412,13 @@ def _test_coarse_freq_comp():
         0.8242589137674079    +0.05237121301226816j    ,
         0.4470515304312367    +0.4294693178683514j     ])
 
+    return in_frame, expected_frame
+
+def _test_coarse_freq_comp():
+    mod = sksdr.QPSK
+    sample_rate = 200.0e3
+    resolution = 25.0
+    in_frame, expected_frame = _vectors()
     cfc = sksdr.CoarseFrequencyComp(mod.order, sample_rate, resolution)
     out_frame = np.empty_like(in_frame)
     fft_frame = np.empty(cfc.fft_size, dtype=complex)
@@ -423,3 +428,207 @@ def _test_coarse_freq_comp():
 def test_coarse_freq_comp(benchmark):
     out_frame, expected_frame = benchmark(_test_coarse_freq_comp)
     assert np.allclose(out_frame, expected_frame)
+
+def test_coarse_freq_comp_wrap():
+    # Blocks that do not divide fft_size, so the circular buffer wraps around
+    sample_rate = 200.0e3
+    freq_offset = 1234.5
+    rng = np.random.default_rng(0)
+    cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0, workers=2)
+    hist = np.zeros(cfc.fft_size, dtype=complex)
+    for n in [300, 1500, 2048, 700] * 3:
+        inp = np.exp(1j * (2 * np.pi * freq_offset * np.arange(n) / sample_rate + rng.integers(0, 4, n) * np.pi / 2 + np.pi / 4))
+        out = np.empty_like(inp)
+        shifted_fft = np.empty(cfc.fft_size)
+        _, est = cfc(inp, out, shifted_fft)
+        hist = np.hstack((hist[n:], inp**sksdr.QPSK.order))
+        assert np.allclose(shifted_fft, np.fft.fftshift(abs(np.fft.fft(hist))))
+    assert abs(est - freq_offset) <= sample_rate / cfc.fft_size / sksdr.QPSK.order
+
+def test_coarse_freq_comp_band_limited():
+    # The admissible bins must match the full spectrum, both for the sliding DFT and the pruned FFT
+    sample_rate = 200.0e3
+    rng = np.random.default_rng(1)
+    for max_freq_offset, block_sizes in [(100.0, [31, 50, 17, 100, 3] * 20), (3000.0, [300, 1500, 2048, 700])]:
+        for search in [sksdr.SpectralSearch.SLIDING_DFT, sksdr.SpectralSearch.PRUNED_FFT]:
+            cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0)
+            cfc_band = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0,
+                                                 max_freq_offset=max_freq_offset, search=search)
+            for n in block_sizes:
+                inp = np.exp(1j * (2 * np.pi * 0.7 * max_freq_offset * np.arange(n) / sample_rate + rng.integers(0, 4, n) * np.pi / 2))
+                inp += 0.05 * rng.standard_normal(n)
+                shifted_fft = np.empty(cfc.fft_size)
+                shifted_fft_band = np.empty(cfc.fft_size)
+                _, est = cfc(inp, np.empty_like(inp), shifted_fft)
+                _, est_band = cfc_band(inp, np.empty_like(inp), shifted_fft_band)
+                band = shifted_fft_band != 0
+                assert np.allclose(shifted_fft[band], shifted_fft_band[band])
+                assert est == est_band
+
+@pytest.mark.parametrize('n', [100, 1000, 10000])
+@pytest.mark.parametrize('search', [None] + list(sksdr.SpectralSearch))
+def test_coarse_freq_comp_search(benchmark, search, n):
+    # Time per call of each method with few admissible bins and a large FFT, where the method chosen on each call must be the fastest
+    sample_rate = 200.0e3
+    freq_offset = 3.7
+    cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 1.0, max_freq_offset=5.0, search=search)
+    rng = np.random.default_rng(5)
+
+    def tone(start, stop):
+        return np.exp(1j * (2 * np.pi * freq_offset * np.arange(start, stop) / sample_rate + rng.integers(0, 4, stop - start) * np.pi / 2))
+
+    # Fill the buffer, then time the calls with new blocks
+    inp = tone(0, cfc.fft_size)
+    cfc(inp, np.empty_like(inp))
+    blocks = [tone(cfc.fft_size + i * n, cfc.fft_size + (i + 1) * n) for i in range(4)]
+    out = np.empty(n, dtype=complex)
+    for block in blocks:
+        _, est = cfc(block, out)
+        assert abs(est - freq_offset) <= sample_rate / cfc.fft_size / sksdr.QPSK.order
+    calls = iter(range(1 << 30))
+
+    def estimate():
+        # The blocks are repeated, so the estimate is no longer meaningful
+        return cfc(blocks[next(calls) % len(blocks)], out)
+
+    benchmark(estimate)
+
+def test_coarse_freq_comp_zoom():
+    # A small FFT refined with a zoom DFT must attain the resolution of the full size FFT
+    sample_rate = 200.0e3
+    freq_res = 25.0
+    freq_offset = 1234.5
+    rng = np.random.default_rng(2)
+    cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, freq_res, fft_size=512)
+    assert cfc.fft_size == 512
+    n = 200
+    for i in range(5):
+        time_steps = np.arange(i * n, (i + 1) * n)
+        inp = np.exp(1j * (2 * np.pi * freq_offset * time_steps / sample_rate + rng.integers(0, 4, n) * np.pi / 2))
+        _, est = cfc(inp, np.empty_like(inp))
+    fine_res = sample_rate / 2**np.ceil(np.log2(sample_rate / freq_res)) / sksdr.QPSK.order
+    assert abs(est - freq_offset) <= fine_res / 2
+
+@pytest.mark.parametrize('fft_size', [64, 1024])
+def test_coarse_freq_comp_zoom_memory(fft_size):
+    # The memory of the zoom DFT must depend on the FFT size and the zoom factor, not on the resolution target squared
+    sample_rate = 200.0e3
+    inp = np.exp(2j * np.pi * 1234.5 * np.arange(fft_size) / sample_rate)
+    tracemalloc.start()
+    try:
+        cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 1.0, fft_size=fft_size)
+        cfc(inp, np.empty_like(inp))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The dense kernel took 8.4 MB, and a full size buffer 4.2 MB
+    assert peak < 1e6
+
+@pytest.mark.parametrize('peak_interp', [None] + list(sksdr.PeakInterpolation))
+@pytest.mark.parametrize('fft_size', [256, 1024, 8192])
+def test_coarse_freq_comp_peak_interp(benchmark, fft_size, peak_interp):
+    # Accuracy/time trade-off of sub-bin interpolation, against the raw argmax of the same FFT size
+    mod = sksdr.QPSK
+    sample_rate = 200.0e3
+    bin_width = sample_rate / fft_size / mod.order
+    # 0.37 bins off the FFT grid
+    freq_offset = (fft_size // 32 + 0.37) * bin_width
+    rng = np.random.default_rng(6)
+    inp = np.exp(1j * (2 * np.pi * freq_offset * np.arange(fft_size) / sample_rate + rng.integers(0, 4, fft_size) * np.pi / 2))
+    inp += 0.1 * (rng.standard_normal(fft_size) + 1j * rng.standard_normal(fft_size)) / np.sqrt(2)
+    out = np.empty_like(inp)
+
+    def setup():
+        # A resolution of one bin disables the zoom DFT
+        cfc = sksdr.CoarseFrequencyComp(mod.order, sample_rate, sample_rate / fft_size, peak_interp=peak_interp)
+        return (cfc,), {}
+
+    def estimate(cfc):
+        return cfc(inp, out)[1]
+
+    est = benchmark.pedantic(estimate, setup=setup, rounds=50)
+    benchmark.extra_info['error'] = est - freq_offset
+    error = abs(est - freq_offset) / bin_width
+    if peak_interp is None:
+        assert np.isclose(error, 0.37)
+    else:
+        assert error < 0.37 and error < 0.5
+        if peak_interp != sksdr.PeakInterpolation.PARABOLIC:
+            # The parabola fitted to the magnitude is biased for an unwindowed tone
+            assert error < 0.02
+
+def test_coarse_freq_comp_hold():
+    # Once locked, the estimate is held and the correction stays phase continuous across calls
+    sample_rate = 200.0e3
+    freq_offset = 1234.5
+    rng = np.random.default_rng(3)
+    cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0, update_interval=2, lock_snr=20.0)
+    n = 500
+    ests = []
+    correction = []
+    for i in range(20):
+        time_steps = np.arange(i * n, (i + 1) * n)
+        inp = np.exp(1j * (2 * np.pi * freq_offset * time_steps / sample_rate + rng.integers(0, 4, n) * np.pi / 2))
+        out = np.empty_like(inp)
+        _, est = cfc(inp, out)
+        ests.append(est)
+        correction.append(out * np.conj(inp))
+    assert cfc.locked
+    assert len(set(ests[-10:])) == 1
+    phase_steps = np.diff(np.unwrap(np.angle(np.hstack(correction[-10:]))))
+    assert np.allclose(phase_steps, -2 * np.pi * ests[-1] / sample_rate)
+    cfc.unlock()
+    assert not cfc.locked
+    # Without a lock SNR, it would never lock
+    with pytest.raises(ValueError):
+        sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0, freeze=True)
+
+def test_coarse_freq_comp_hold_memory():
+    # Checking the held peak must not allocate arrays of the size of the buffer
+    sample_rate = 200.0e3
+    freq_offset = 1234.5
+    rng = np.random.default_rng(7)
+    cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 0.5, lock_snr=20.0, num_channels=2)
+    assert cfc.fft_size == 1 << 19
+    n = 1000
+    for i in range(3):
+        time_steps = np.arange(i * n, (i + 1) * n)
+        inp = np.tile(np.exp(1j * (2 * np.pi * freq_offset * time_steps / sample_rate + rng.integers(0, 4, n) * np.pi / 2)), (2, 1))
+        out = np.empty_like(inp)
+        if i == 0:
+            # Estimated and locked
+            _, ests = cfc(inp, out)
+            continue
+        tracemalloc.start()
+        try:
+            _, ests = cfc(inp, out)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert cfc.locked
+    assert np.allclose(ests, ests[0])
+    # The dense kernel and its index took 16 MB per channel
+    assert peak < 1e6
+
+def test_coarse_freq_comp_multichannel():
+    # A batched multi-channel object must match one object per channel
+    sample_rate = 200.0e3
+    freq_offsets = [1234.5, -567.8, 3000.0]
+    rng = np.random.default_rng(4)
+    cfc = sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0, num_channels=len(freq_offsets))
+    cfcs = [sksdr.CoarseFrequencyComp(sksdr.QPSK.order, sample_rate, 100.0) for _ in freq_offsets]
+    n = 300
+    for i in range(10):
+        time_steps = np.arange(i * n, (i + 1) * n)
+        inp = np.stack([np.exp(1j * (2 * np.pi * f * time_steps / sample_rate + rng.integers(0, 4, n) * np.pi / 2)) for f in freq_offsets])
+        out = np.empty_like(inp)
+        shifted_fft = np.empty((len(freq_offsets), cfc.fft_size))
+        _, ests = cfc(inp, out, shifted_fft)
+        for c, single in enumerate(cfcs):
+            single_out = np.empty(n, dtype=complex)
+            single_fft = np.empty(cfc.fft_size)
+            _, est = single(inp[c], single_out, single_fft)
+            assert ests[c] == est
+            assert np.allclose(out[c], single_out)
+            assert np.allclose(shifted_fft[c], single_fft)
+    assert np.all(np.abs(ests - freq_offsets) <= sample_rate / cfc.fft_size / sksdr.QPSK.order)
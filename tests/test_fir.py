@@ -0,0 +1,75 @@
+import logging
+
+import numpy as np
+import pytest
+import scipy.signal as signal
+import sksdr
+
+_log = logging.getLogger(__name__)
+
+@pytest.mark.parametrize('method', [None, sksdr.FirMethod.DIRECT, sksdr.FirMethod.CONVOLVE, sksdr.FirMethod.FFT])
+@pytest.mark.parametrize('num_taps', [1, 3, 127])
+def test_streaming_fir(method, num_taps):
+    # The output must match a streaming lfilter, whichever method is used for each block
+    rng = np.random.default_rng(1)
+    coeffs = rng.standard_normal(num_taps) + 1j * rng.standard_normal(num_taps)
+    fir = sksdr.StreamingFIR(coeffs, method)
+    filter_state = np.zeros(num_taps - 1, dtype=complex)
+    assert len(fir(np.empty(0, dtype=complex))) == 0
+    for n in [10, 5000, 1, 300, 20000, 64]:
+        inp = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+        expected, filter_state = signal.lfilter(coeffs, 1, inp, zi=filter_state)
+        assert np.allclose(fir(inp), expected)
+
+def test_streaming_fir_real():
+    # Real coefficients and input must give a real output
+    rng = np.random.default_rng(2)
+    coeffs = rng.standard_normal(64)
+    inp = rng.standard_normal(10000)
+    for method in sksdr.FirMethod:
+        out = sksdr.StreamingFIR(coeffs, method)(inp)
+        assert not np.iscomplexobj(out)
+        assert np.allclose(out, signal.lfilter(coeffs, 1, inp))
+
+def test_streaming_fir_at():
+    # Part of a block must match the same outputs of the whole block
+    rng = np.random.default_rng(3)
+    coeffs = rng.standard_normal(31)
+    fir, whole = sksdr.StreamingFIR(coeffs), sksdr.StreamingFIR(coeffs)
+    head = rng.standard_normal(100)
+    fir(head)
+    whole(head)
+    inp = rng.standard_normal(1000)
+    expected = whole(inp)
+    ext = fir.extend(inp)
+    assert np.allclose(fir.at(ext, 200, 260), expected[200:260])
+    assert len(fir.at(ext, 10, 5)) == 0
+
+@pytest.mark.parametrize('method', [None, sksdr.FirMethod.DIRECT, sksdr.FirMethod.CONVOLVE, sksdr.FirMethod.FFT])
+@pytest.mark.parametrize('num_taps', [2, 11, 64])
+def test_streaming_fir_real_coeffs(method, num_taps):
+    # Real coefficients must filter the real and imaginary parts of a complex input
+    rng = np.random.default_rng(4)
+    coeffs = rng.standard_normal(num_taps)
+    fir = sksdr.StreamingFIR(coeffs, method)
+    filter_state = np.zeros(num_taps - 1, dtype=complex)
+    for n in [10, 5000, 1, 300]:
+        inp = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+        expected, filter_state = signal.lfilter(coeffs, 1, inp, zi=filter_state)
+        assert np.allclose(fir(inp), expected)
+
+@pytest.mark.parametrize('method', [None, sksdr.FirMethod.DIRECT, sksdr.FirMethod.CONVOLVE, sksdr.FirMethod.FFT])
+def test_streaming_fir_bank(method):
+    # Each row of a bank must match the output of its own filter
+    rng = np.random.default_rng(3)
+    coeffs = rng.standard_normal((3, 31)) + 1j * rng.standard_normal((3, 31))
+    fir = sksdr.StreamingFIR(coeffs, method)
+    filter_states = np.zeros((3, 30), dtype=complex)
+    assert fir(np.empty(0, dtype=complex)).shape == (3, 0)
+    for n in [10, 5000, 1, 300]:
+        inp = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+        out = fir(inp)
+        assert out.shape == (3, n)
+        for i in range(3):
+            expected, filter_states[i] = signal.lfilter(coeffs[i], 1, inp, zi=filter_states[i])
+            assert np.allclose(out[i], expected)
@@ -1,11 +1,44 @@
 import logging
 
 import numpy as np
+import pytest
 import sksdr
 from sksdr.utils import Endian
 
 _log = logging.getLogger(__name__)
 
+# Barker 13 preamble, each bit repeated twice, on the QPSK diagonal
+_PREAMBLE = np.repeat(2 * np.array(sksdr.UNIPOLAR_BARKER_SEQ[13]) - 1, 2) * (1 + 1j) / np.sqrt(2)
+
+def _frames(rng, gaps, frame_size=100, payload=True, noise=0.0, freq_offset=0.0, lead_in=0):
+    """
+    Builds an input with a frame starting with :data:`_PREAMBLE` after each gap.
+
+    :param rng: Random generator
+    :param gaps: Number of zeros before each frame
+    :param frame_size: Frame size, including the preamble
+    :param payload: Whether the payloads are random QPSK symbols. Otherwise, they're zeros.
+    :param noise: Standard deviation of the complex Gaussian noise added to the input
+    :param freq_offset: Frequency offset of the input, normalized to the sampling rate
+    :param lead_in: Number of zeros before the first gap
+    :return: Input, and start of each frame
+    """
+    parts = [np.zeros(lead_in, dtype=complex)]
+    frame_starts = []
+    pos = lead_in
+    for gap in gaps:
+        if payload:
+            data = (2 * rng.integers(0, 2, frame_size - len(_PREAMBLE)) - 1) * (1 + 1j) / np.sqrt(2)
+        else:
+            data = np.zeros(frame_size - len(_PREAMBLE), dtype=complex)
+        parts.extend((np.zeros(gap, dtype=complex), _PREAMBLE, data))
+        frame_starts.append(pos + gap)
+        pos += gap + frame_size
+    inp = np.hstack(parts)
+    inp += noise * (rng.standard_normal(len(inp)) + 1j * rng.standard_normal(len(inp))) / np.sqrt(2)
+    inp *= np.exp(2j * np.pi * freq_offset * np.arange(len(inp)))
+    return inp, np.array(frame_starts)
+
 def test_frame_sync():
     threshold = 8.0
     frame_size = 100
@@ -334,3 +367,209 @@ def test_frame_sync():
     out_frame = np.empty(frame_size, dtype=complex)
     frame_sync(in_frame, out_frame)
     assert np.allclose(out_frame, expected_frame)
+
+def test_frame_sync_no_growth():
+    # Without detections, the buffers must not grow nor be reallocated
+    frame_size = 100
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, 1e3, frame_size)
+    rng = np.random.default_rng(0)
+    out_frame = np.empty(frame_size, dtype=complex)
+    for i in range(50):
+        inp = rng.standard_normal(frame_size) + 1j * rng.standard_normal(frame_size)
+        assert not frame_sync(inp, out_frame)
+        if i == 0:
+            buf = frame_sync._buf
+    assert frame_sync._buf is buf
+    assert frame_sync._tail - frame_sync._head == len(_PREAMBLE) - 1
+
+@pytest.mark.parametrize('detection, threshold', [(sksdr.FrameDetection.ABSOLUTE, 10.0), (sksdr.FrameDetection.NORMALIZED, 0.8)])
+def test_frame_sync_real_then_complex(detection, threshold):
+    # A complex input after real ones must keep its imaginary part, and be detected by the magnitude of the correlation
+    frame_size = 100
+    preamble = 2 * np.array(sksdr.UNIPOLAR_BARKER_SEQ[13]) - 1.0
+    frame_sync = sksdr.PreambleSync(preamble, threshold, frame_size, detection=detection)
+    out_frame = np.empty(frame_size, dtype=complex)
+    assert not frame_sync(np.zeros(50), out_frame)
+    frame = 1j * np.concatenate((preamble, np.ones(frame_size - len(preamble))))
+    assert frame_sync(np.concatenate((np.zeros(30, dtype=complex), frame, np.zeros(200))), out_frame)
+    assert np.all(out_frame == frame)
+
+def test_frame_sync_frames():
+    # Every frame in a large input must be output at once, with its absolute offset
+    frame_size = 100
+    rng = np.random.default_rng(2)
+    inp, frame_starts = _frames(rng, rng.integers(0, 50, 20), frame_size)
+
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.9 * len(_PREAMBLE), frame_size)
+    out_frames = np.empty((15, frame_size), dtype=complex)
+    offsets = np.empty(15, dtype=int)
+    num_frames = frame_sync.call__frames(inp[:1000], out_frames, offsets)
+    num_frames += frame_sync.call__frames(inp[1000:], out_frames[num_frames:], offsets[num_frames:])
+    assert num_frames == 15
+    assert np.all(offsets == frame_starts[:15])
+    # The frames that didn't fit are output on the next calls
+    num_frames = frame_sync.call__frames(inp[:0], out_frames, offsets)
+    assert num_frames == 5
+    assert np.all(offsets[:num_frames] == frame_starts[15:])
+    for offset, frame in zip(offsets[:num_frames], out_frames):
+        assert np.array_equal(frame, inp[offset:offset + frame_size])
+
+def test_frame_sync_views():
+    # Views and offsets must locate the same frames as call__frames, without copying them
+    frame_size = 100
+    rng = np.random.default_rng(6)
+    inp, _ = _frames(rng, rng.integers(0, 50, 10), frame_size)
+    blocks = np.array_split(inp, 6)
+
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.9 * len(_PREAMBLE), frame_size)
+    expected_frames = np.empty((10, frame_size), dtype=complex)
+    expected_offsets = np.empty(10, dtype=int)
+    num_frames = 0
+    for block in blocks:
+        num_frames += frame_sync.call__frames(block, expected_frames[num_frames:], expected_offsets[num_frames:])
+    assert num_frames == 10
+
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.9 * len(_PREAMBLE), frame_size)
+    frames = []
+    offsets = np.empty(10, dtype=int)
+    for block in blocks:
+        views = frame_sync.call__views(block, offsets=offsets[len(frames):])
+        for view in views:
+            assert view.base is not None and not view.flags.writeable
+        frames.extend(view.copy() for view in views)
+    assert np.array_equal(frames, expected_frames)
+    assert np.all(offsets == expected_offsets)
+
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.9 * len(_PREAMBLE), frame_size)
+    num_frames = 0
+    for block in blocks:
+        num_frames += frame_sync.call__offsets(block, offsets[num_frames:])
+    assert num_frames == 10
+    assert np.all(offsets == expected_offsets)
+
+@pytest.mark.parametrize('detection, threshold', [(sksdr.FrameDetection.NORMALIZED, 0.8), (sksdr.FrameDetection.CFAR, 8.0)])
+def test_frame_sync_detection(detection, threshold):
+    # Frames must be detected with the same threshold while the signal level changes by 60 dB
+    frame_size = 100
+    rng = np.random.default_rng(5)
+    # Lead-in for the CFAR reference window
+    inp, frame_starts = _frames(rng, rng.integers(0, 50, 20), frame_size, payload=False, noise=0.1, lead_in=200)
+    inp *= np.logspace(-3, 3, len(inp))
+
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, threshold, frame_size, detection)
+    out_frames = np.empty((20, frame_size), dtype=complex)
+    offsets = np.empty(20, dtype=int)
+    num_frames = 0
+    for block in np.array_split(inp, 9):
+        num_frames += frame_sync.call__frames(block, out_frames[num_frames:], offsets[num_frames:])
+    assert num_frames == 20
+    assert np.all(offsets == frame_starts)
+
+def test_frame_sync_two_stage():
+    # The two-stage detector must find the same frames as the full-precision one
+    frame_size = 100
+    rng = np.random.default_rng(7)
+    inp, _ = _frames(rng, rng.integers(0, 50, 20), frame_size, noise=0.3)
+
+    offsets = []
+    for coarse_threshold in [None, 0.5]:
+        frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.8 * len(_PREAMBLE), frame_size, coarse_threshold=coarse_threshold)
+        out_frames = np.empty((20, frame_size), dtype=complex)
+        offsets.append(np.empty(20, dtype=int))
+        num_frames = 0
+        for block in np.array_split(inp, 7):
+            num_frames += frame_sync.call__frames(block, out_frames[num_frames:], offsets[-1][num_frames:])
+        assert num_frames == 20
+    assert np.all(offsets[0] == offsets[1])
+
+def test_frame_sync_two_stage_long():
+    # The packed coarse correlation of a long preamble with a phase offset must not overflow
+    rng = np.random.default_rng(8)
+    preamble = (2 * rng.integers(0, 2, 9000) - 1 + 1j * (2 * rng.integers(0, 2, 9000) - 1)) / np.sqrt(2)
+    frame_size = len(preamble) + 100
+    frame_sync = sksdr.PreambleSync(preamble, 0.8 * len(preamble), frame_size, coarse_threshold=0.5)
+    frame = 1j * np.concatenate((preamble, np.ones(100)))
+    out_frame = np.empty(frame_size, dtype=complex)
+    assert frame_sync(np.concatenate((np.zeros(500, dtype=complex), frame, np.zeros(frame_size))), out_frame)
+    assert np.allclose(out_frame, frame)
+
+    with pytest.raises(ValueError):
+        sksdr.PreambleSync(np.ones(16377, dtype=complex), 1.0, 20000, coarse_threshold=0.5)
+    sksdr.PreambleSync(np.ones(16376, dtype=complex), 1.0, 20000, coarse_threshold=0.5)
+
+def test_frame_sync_differential():
+    # With a large frequency offset, only the differential correlation must find every frame
+    frame_size = 100
+    rng = np.random.default_rng(8)
+    inp, frame_starts = _frames(rng, rng.integers(0, 50, 20), frame_size, payload=False, noise=0.1, freq_offset=0.04)
+
+    num_frames = []
+    for differential in [False, True]:
+        frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.8 * (len(_PREAMBLE) - differential), frame_size, differential=differential)
+        out_frames = np.empty((20, frame_size), dtype=complex)
+        offsets = np.empty(20, dtype=int)
+        num_frames.append(0)
+        for block in np.array_split(inp, 7):
+            num_frames[-1] += frame_sync.call__frames(block, out_frames[num_frames[-1]:], offsets[num_frames[-1]:])
+    assert num_frames[0] < 20
+    assert num_frames[1] == 20
+    assert np.all(offsets == frame_starts)
+
+def test_preamble_bank_sync():
+    # Frames starting with any of the Barker sequences must be output with the index of their preamble
+    frame_size = 100
+    seqs = [sksdr.UNIPOLAR_BARKER_SEQ[n] for n in (7, 11, 13)]
+    preambles = [sksdr.bipolar(seq) for seq in seqs]
+    rng = np.random.default_rng(4)
+    parts = []
+    frame_starts = []
+    frame_ids = []
+    pos = 0
+    for _ in range(20):
+        gap = rng.integers(0, 50)
+        i = rng.integers(0, len(preambles))
+        payload = 0.1 * rng.standard_normal(frame_size - len(preambles[i]))
+        parts.extend((0.1 * rng.standard_normal(gap), preambles[i], payload))
+        frame_starts.append(pos + gap)
+        frame_ids.append(i)
+        pos += gap + frame_size
+    inp = np.hstack(parts)
+
+    frame_sync = sksdr.PreambleBankSync.from_sequences(seqs, [0.8 * len(p) for p in preambles], frame_size)
+    out_frames = np.empty((20, frame_size))
+    offsets = np.empty(20, dtype=int)
+    ids = np.empty(20, dtype=int)
+    num_frames = 0
+    for block in np.array_split(inp, 7):
+        num_frames += frame_sync.call__frames(block, out_frames[num_frames:], offsets[num_frames:], ids[num_frames:])
+    assert num_frames == 20
+    assert np.all(offsets == frame_starts)
+    assert np.all(ids == frame_ids)
+    for offset, frame in zip(offsets, out_frames):
+        assert np.array_equal(frame, inp[offset:offset + frame_size])
+
+def test_frame_sync_flywheel():
+    # Back to back frames must be found by searching around the predicted positions only, and after a gap by searching everywhere again
+    frame_size = 100
+    gaps = np.zeros(40, dtype=int)
+    gaps[0], gaps[20] = 10, 137
+    inp, frame_starts = _frames(np.random.default_rng(9), gaps, frame_size)
+
+    frame_sync = sksdr.PreambleSync(_PREAMBLE, 0.9 * len(_PREAMBLE), frame_size, flywheel=3, flywheel_window=5, flywheel_misses=2)
+    out_frames = np.empty((40, frame_size), dtype=complex)
+    offsets = np.empty(40, dtype=int)
+    num_frames = 0
+    locked = []
+    for block in np.array_split(inp, 57):
+        was_locked = frame_sync.locked
+        num_frames += frame_sync.call__frames(block, out_frames[num_frames:], offsets[num_frames:])
+        locked.append(frame_sync.locked)
+        if was_locked and frame_sync.locked:
+            # Only the windows around the predicted peaks are correlated
+            assert np.count_nonzero(frame_sync._xcorr[frame_sync._tail - len(block):frame_sync._tail]) <= 2 * 11
+    assert np.all(np.isin(offsets[:num_frames], frame_starts))
+    # At most the frames missed before searching everywhere again are lost
+    assert num_frames >= 38
+    assert np.all(np.isin(frame_starts[:20], offsets[:num_frames]))
+    assert np.all(np.isin(frame_starts[-17:], offsets[:num_frames]))
+    assert locked[-1] and not all(locked)
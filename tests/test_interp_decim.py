@@ -0,0 +1,203 @@
+import logging
+
+import numpy as np
+import pytest
+import scipy.signal as signal
+import sksdr
+
+_log = logging.getLogger(__name__)
+
+def _stream(block, inp, out, *args, sizes=(10, 1, 0, 257, 3, 400, 329)):
+    """
+    Feeds an input signal to a streaming block in pieces of several sizes, including empty ones.
+
+    :param block: Block, called with a piece of the input, the rest of the output, and the pieces of ``args``
+    :param inp: Input signal
+    :param out: Output signal
+    :param args: Other arrays with one element per input sample
+    :param sizes: Sizes of the pieces, adding up to the input length
+    :return: Total number of samples written to ``out``
+    """
+    pos = 0
+    count = 0
+    for n in sizes:
+        count += block(inp[pos:pos + n], out[count:], *(arg[pos:pos + n] for arg in args))
+        pos += n
+    assert pos == len(inp)
+    return count
+
+def test_fir_interpolator():
+    # The polyphase interpolator must match filtering the zero-stuffed signal, across blocks of any size
+    factor = 4
+    coeffs = signal.firwin(41, 1 / factor)
+    interp = sksdr.FirInterpolator(factor, coeffs)
+    rng = np.random.default_rng(0)
+    filter_state = np.zeros(len(coeffs) - 1, dtype=complex)
+    for n in [10, 1, 257, 3]:
+        inp = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+        upsampled = np.empty(n * factor, dtype=complex)
+        sksdr.upsample(inp, factor, upsampled)
+        expected, filter_state = signal.lfilter(coeffs, 1, upsampled, zi=filter_state)
+        filtered = np.empty(n * factor, dtype=complex)
+        interp(inp, filtered)
+        assert np.allclose(filtered, expected)
+
+def test_fir_decimator():
+    # Only the samples with an index multiple of the factor must be kept, across blocks of any size
+    factor = 4
+    coeffs = signal.firwin(41, 1 / factor)
+    decim = sksdr.FirDecimator(factor, coeffs)
+    rng = np.random.default_rng(1)
+    inp = rng.standard_normal(1000) + 1j * rng.standard_normal(1000)
+    expected = signal.lfilter(coeffs, 1, inp)[::factor]
+    downsampled = np.empty(len(expected), dtype=complex)
+    filtered = np.empty(len(inp), dtype=complex)
+    count = _stream(decim, inp, downsampled, filtered)
+    assert count == len(expected)
+    assert np.allclose(downsampled, expected)
+    assert np.allclose(filtered, signal.lfilter(coeffs, 1, inp))
+
+def test_fir_resampler():
+    # The output must match upsampling, filtering and downsampling, across blocks of any size
+    interpolation, decimation = 5, 3
+    coeffs = sksdr.resampling_filter(interpolation, decimation)
+    resampler = sksdr.FirResampler(interpolation, decimation)
+    assert resampler.coeffs is coeffs and not coeffs.flags.writeable
+    rng = np.random.default_rng(2)
+    inp = rng.standard_normal(1000) + 1j * rng.standard_normal(1000)
+    upsampled = np.empty(len(inp) * interpolation, dtype=complex)
+    sksdr.upsample(inp, interpolation, upsampled)
+    expected = signal.lfilter(coeffs, 1, upsampled)[::decimation]
+    out = np.empty(len(expected) + 1, dtype=complex)
+    count = _stream(resampler, inp, out)
+    assert count == len(expected)
+    assert np.allclose(out[:count], expected)
+
+def test_fir_resampler_tone():
+    # A tone in the passband must keep its frequency and amplitude
+    resampler = sksdr.FirResampler(10, 8)
+    assert (resampler.interpolation, resampler.decimation) == (5, 4)
+    inp = np.exp(2j * np.pi * 0.05 * np.arange(4000))
+    out = np.empty(5000, dtype=complex)
+    count = resampler(inp, out)
+    assert count == 5000
+    steady = out[1000:]
+    assert np.allclose(np.abs(steady), 1, atol=1e-2)
+    assert np.allclose(steady[1:] / steady[:-1], np.exp(2j * np.pi * 0.05 * 4 / 5), atol=1e-2)
+
+def test_halfband_filter():
+    # The coefficients at an even distance from the center must be zero, and the DC gain 1
+    coeffs = sksdr.halfband_filter(23)
+    assert coeffs is sksdr.halfband_filter(23) and not coeffs.flags.writeable
+    assert coeffs[11] == 0.5
+    assert np.all(np.delete(coeffs[1::2], 5) == 0) and np.all(coeffs[::2] != 0)
+    assert np.isclose(np.sum(coeffs), 1)
+    with pytest.raises(ValueError):
+        sksdr.halfband_filter(21)
+
+def test_halfband_decimator():
+    # The output must match filtering and downsampling by 2 at each stage, across blocks of any size
+    decim = sksdr.HalfbandDecimator(3)
+    assert decim.factor == 8
+    rng = np.random.default_rng(3)
+    inp = rng.standard_normal(1000) + 1j * rng.standard_normal(1000)
+    expected = inp
+    for _ in range(3):
+        expected = signal.lfilter(decim.coeffs, 1, expected)[::2]
+    out = np.empty(len(expected) + 1, dtype=complex)
+    count = _stream(decim, inp, out)
+    assert count == len(expected)
+    assert np.allclose(out[:count], expected)
+
+def _cic_response(factor, num_stages, delay):
+    coeffs = np.ones(1)
+    for _ in range(num_stages):
+        coeffs = np.convolve(coeffs, np.ones(factor * delay))
+    return coeffs / (factor * delay)**num_stages
+
+def test_cic_decimator():
+    # The output must match moving averages and downsampling, across blocks of any size
+    factor, num_stages, delay = 16, 3, 2
+    decim = sksdr.CicDecimator(factor, num_stages, delay)
+    rng = np.random.default_rng(4)
+    inp = rng.standard_normal(5000) + 1j * rng.standard_normal(5000)
+    expected = signal.lfilter(_cic_response(factor, num_stages, delay), 1, inp)[::factor]
+    out = np.empty(len(expected) + 1, dtype=complex)
+    count = _stream(decim, inp, out, sizes=(10, 1, 0, 2000, 3, 2986))
+    assert count == len(expected)
+    assert np.allclose(out[:count], expected)
+    with pytest.raises(ValueError):
+        sksdr.CicDecimator(factor, num_stages, delay, frac_bits=60)
+
+def test_cic_decimator_wrap():
+    # The integrators must overflow without affecting the output
+    decim = sksdr.CicDecimator(64, 4)
+    out = np.empty(1 << 15)
+    for _ in range(4):
+        assert decim(np.full(1 << 21, 3.0), out) == len(out)
+        assert np.all(out[8:] == 3.0)
+
+def test_cic_interpolator():
+    # The output must match upsampling and moving averages, across blocks of any size
+    factor, num_stages, delay = 8, 4, 1
+    interp = sksdr.CicInterpolator(factor, num_stages, delay)
+    rng = np.random.default_rng(5)
+    inp = rng.standard_normal(1000)
+    upsampled = np.empty(len(inp) * factor)
+    sksdr.upsample(inp, factor, upsampled)
+    expected = signal.lfilter(_cic_response(factor, num_stages, delay) * factor, 1, upsampled)
+    out = np.empty(len(expected))
+    count = 0
+    for block in np.array_split(inp, 5):
+        count += interp(block, out[count:])
+    assert count == len(expected)
+    assert np.allclose(out, expected)
+
+@pytest.mark.parametrize('factor, num_stages, delay', [(16, 3, 1), (16, 3, 2), (8, 4, 4)])
+def test_cic_compensation_filter(factor, num_stages, delay):
+    # The droop of the CIC filter must be compensated in the passband, which is below the first null
+    coeffs = sksdr.cic_compensation_filter(factor, num_stages, delay)
+    assert coeffs is sksdr.cic_compensation_filter(factor, num_stages, delay) and not coeffs.flags.writeable
+    freqs = np.linspace(0, 0.4 / delay, 50)
+    _, response = signal.freqz(coeffs, worN=np.pi * freqs)
+    _, cic_response = signal.freqz(_cic_response(factor, num_stages, delay), worN=np.pi * freqs / factor)
+    assert np.allclose(np.abs(response * cic_response), 1, atol=0.01)
+    with pytest.raises(ValueError):
+        sksdr.cic_compensation_filter(factor, num_stages, delay, cutoff=2 / delay)
+
+def test_farrow_coeffs():
+    # Order 2 must be the interpolator of SymbolSync, and odd orders must interpolate the samples
+    sym_sync = sksdr.SymbolSync(sksdr.QPSK, 4, 1.0, 0.01, 1.0, 1.0)
+    assert np.array_equal(sksdr.farrow_coeffs(2), sym_sync._coeffs[:, ::-1])
+    coeffs = sksdr.farrow_coeffs(5)
+    assert coeffs is sksdr.farrow_coeffs(5) and not coeffs.flags.writeable
+    assert np.allclose(coeffs[0], [0, 0, 1, 0, 0, 0])
+    assert np.allclose(np.sum(coeffs, axis=0), [0, 0, 0, 1, 0, 0])
+    with pytest.raises(ValueError):
+        sksdr.farrow_coeffs(4)
+
+@pytest.mark.parametrize('order, atol', [(2, 1e-2), (3, 1e-4), (5, 1e-6)])
+def test_farrow_resampler(order, atol):
+    # A tone must be resampled at the times given by the ratio trajectory, across blocks of any size
+    freq = 0.02
+    ratio = 1.37 + 0.1 * np.sin(np.arange(5000) / 300)
+    inp = np.exp(2j * np.pi * freq * np.arange(len(ratio)))
+    resampler = sksdr.FarrowResampler(1.0, order)
+    out = np.empty(int(np.sum(ratio)) + 1, dtype=complex)
+    count = _stream(resampler, inp, out, ratio, sizes=(10, 1, 0, 2000, 3, 2986))
+    levels = np.concatenate(([0], np.cumsum(ratio)))
+    assert count == np.ceil(levels[-1])
+    times = np.interp(np.arange(count), levels, np.arange(len(levels))) - (order // 2 + 1)
+    assert np.allclose(out[:count][10:], np.exp(2j * np.pi * freq * times)[10:], atol=atol)
+
+def test_farrow_resampler_delay():
+    # A ratio of 1 must delay the input by whole samples
+    resampler = sksdr.FarrowResampler(1.0)
+    inp = np.random.default_rng(7).standard_normal(100)
+    out = np.empty(100)
+    assert resampler(inp[:37], out) + resampler(inp[37:], out[37:]) == 100
+    assert np.allclose(out[2:], inp[:-2])
+    with pytest.raises(ValueError):
+        resampler.ratio = 0
+    with pytest.raises(ValueError):
+        resampler(inp[:3], out, np.array([1.0, -0.5, 1.0]))
@@ -19,3 +19,31 @@ def test_rrc():
     expected_coeffs = np.hstack((expected_coeffs, [0.5683302081417902], np.flip(expected_coeffs)))
     coeffs = sksdr.rrc(upsampling, rolloff, span)
     assert np.all(coeffs == expected_coeffs)
+
+def test_rrc_cache():
+    # Designs must be cached, read-only and shared with RRCPulse
+    coeffs = sksdr.rrc(8, 0.25, 6)
+    assert sksdr.rrc(8, 0.25, 6) is coeffs and not coeffs.flags.writeable
+    assert sksdr.RRCPulse(8, 0.25, 6)() is coeffs
+    # A rolloff of 0.25 with 8 samples per symbol hits the singular points
+    assert np.all(np.isfinite(coeffs))
+    assert np.isclose(np.sum(coeffs**2), 1)
+
+def test_raised_cosine():
+    # The pulse must be zero at every other symbol, and match the RRC pulse convolved with itself
+    sps, rolloff, span = 4, 0.25, 10
+    coeffs = sksdr.raised_cosine(sps, rolloff, span)
+    assert not coeffs.flags.writeable
+    center = len(coeffs) // 2
+    assert np.allclose(np.delete(coeffs[center % sps::sps], center // sps), 0)
+    rrc = sksdr.rrc(sps, rolloff, 3 * span)
+    expected = np.convolve(rrc, rrc)[len(rrc) - 1 - center:len(rrc) + center]
+    assert np.allclose(coeffs / coeffs[center], expected / expected[center], atol=1e-3)
+
+def test_gaussian():
+    # The pulse must be symmetric, with unit DC gain
+    coeffs = sksdr.gaussian(8, 0.3, 4)
+    assert coeffs is sksdr.gaussian(8, 0.3, 4) and not coeffs.flags.writeable
+    assert len(coeffs) == 33
+    assert np.allclose(coeffs, coeffs[::-1])
+    assert np.isclose(np.sum(coeffs), 1)